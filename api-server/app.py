@@ -4,41 +4,72 @@ Docker-deployable alternative to AWS Lambda.
 """
 
 import os
+import re
+import hmac
+import hashlib
+import asyncio
 import json
+import sys
+import queue
 import logging
-import ipaddress
-from typing import Dict, List, Optional, Any, Union
+import socket
+import time
+import platform
+from typing import Dict, Iterable, List, Optional, Any, Sequence, Union
 from pathlib import Path
-from datetime import datetime, timedelta
 from contextlib import asynccontextmanager
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
 
+import aiohttp
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
-from fastapi import FastAPI, Header, HTTPException, Request, Query
+from fastapi import FastAPI, Depends, Header, HTTPException, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse, FileResponse, PlainTextResponse, Response, HTMLResponse
+from fastapi.responses import ORJSONResponse, FileResponse, PlainTextResponse, Response, HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
+from starlette.convertors import Convertor, register_url_convertor
 from starlette.middleware.sessions import SessionMiddleware
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 
-from config import Settings, get_settings, validate_settings
+from config import Settings, get_settings, reload_settings, validate_settings
 from geoip_reader import GeoIPReader
 from cache import get_cache
-from database_updater import update_databases
-
-# Configure logging
+from database_updater import DatabaseUpdater, update_databases
+
+# Configure logging: handlers only enqueue records, and a background listener
+# thread does the formatting and stream I/O off the event loop
+_log_queue: queue.Queue = queue.Queue(-1)
+_log_stream_handler = logging.StreamHandler(sys.stdout)
+_log_stream_handler.setFormatter(
+    logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+)
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    handlers=[QueueHandler(_log_queue)],
+    force=True
 )
+log_listener = QueueListener(_log_queue, _log_stream_handler, respect_handler_level=True)
+log_listener.start()
 logger = logging.getLogger(__name__)
 
 # Load settings
 settings = get_settings()
 
+# Shared S3 client configuration: a larger connection pool, standard retries,
+# and SigV4 resolved up front instead of lazily on the first signing call.
+# Virtual-hosted addressing also keeps pre-signed URLs short.
+_S3_CONFIG = Config(
+    max_pool_connections=64,
+    retries={"mode": "standard", "max_attempts": 3},
+    signature_version="s3v4",
+    s3={"addressing_style": "virtual"}
+)
+
 # Initialize S3 client if using S3 URLs
 s3_client = None
 if settings.use_s3_urls:
@@ -47,14 +78,33 @@ if settings.use_s3_urls:
             's3',
             aws_access_key_id=settings.aws_access_key_id,
             aws_secret_access_key=settings.aws_secret_access_key,
-            region_name=settings.aws_region
+            region_name=settings.aws_region,
+            config=_S3_CONFIG
         )
     else:
         # Use default AWS credentials (IAM role, etc.)
-        s3_client = boto3.client('s3', region_name=settings.aws_region)
+        s3_client = boto3.client('s3', region_name=settings.aws_region, config=_S3_CONFIG)
+
+# Maximum concurrent presign calls offloaded to worker threads; keeps bursts
+# from exhausting the default thread pool (and stays below the S3 pool size)
+PRESIGN_CONCURRENCY = 32
+_presign_semaphore: Optional[asyncio.Semaphore] = None
+
+# Maximum concurrent lookup batches offloaded to worker threads per process;
+# busy periods would otherwise queue a batch per request on the shared pool
+LOOKUP_CONCURRENCY = (os.cpu_count() or 1) * 2
+_lookup_semaphore: Optional[asyncio.Semaphore] = None
+
+# Concurrent admin retry downloads (matches the session's per-host connection limit)
+RETRY_CONCURRENCY = 5
+
+# HTTP session for admin-triggered downloads, created in lifespan so retries
+# reuse pooled keep-alive connections and the DNS cache between calls
+_http_session: Optional[aiohttp.ClientSession] = None
 
 # Initialize GeoIP reader and cache
 geoip_reader = None  # Will be initialized in lifespan
+_database_updater: Optional[DatabaseUpdater] = None  # Created on first admin use
 cache = get_cache(settings.cache_type)
 
 # Initialize scheduler
@@ -75,6 +125,17 @@ AVAILABLE_DATABASES = {
     'IP2PROXY-IP-PROXYTYPE-COUNTRY.BIN': 'raw/ip2location/IP2PROXY-IP-PROXYTYPE-COUNTRY.BIN',
 }
 
+# Immutable views of the database names, built once instead of per request
+_ALL_DB_NAMES: tuple[str, ...] = tuple(AVAILABLE_DATABASES.keys())
+_AVAILABLE_SET: frozenset[str] = frozenset(AVAILABLE_DATABASES)
+
+# Per-database (absolute local path, S3 key / relative path), built once so
+# request paths don't rebuild Path objects
+_DB_META: Dict[str, tuple[Path, str]] = {
+    name: (Path(settings.database_path) / rel_path, rel_path)
+    for name, rel_path in AVAILABLE_DATABASES.items()
+}
+
 # Database aliases and smart matching system
 DATABASE_ALIASES = {
     # Provider-based bulk selection
@@ -122,6 +183,27 @@ DATABASE_ALIASES = {
 }
 
 
+class DatabaseNameConvertor(Convertor):
+    """
+    Path convertor for database names and aliases.
+    
+    Anything outside the characters used by database names (e.g. traversal
+    attempts or scanner junk) fails to match the route and 404s in the router,
+    before authentication or name resolution run.
+    """
+    
+    regex = "[A-Za-z0-9._-]{1,128}"
+    
+    def convert(self, value: str) -> str:
+        return value
+    
+    def to_string(self, value: str) -> str:
+        return value
+
+
+register_url_convertor("dbname", DatabaseNameConvertor())
+
+
 def normalize_database_name(name: str) -> str:
     """Normalize database name for matching."""
     return name.lower().replace('_', '-').replace(' ', '-').strip()
@@ -159,7 +241,7 @@ def resolve_database_names(requested_names: List[str]) -> tuple[List[str], List[
         matched = False
         
         # 1. Exact match (case sensitive) - highest priority
-        if name in AVAILABLE_DATABASES:
+        if name in _AVAILABLE_SET:
             resolved.add(name)
             matched = True
             continue
@@ -221,7 +303,7 @@ def resolve_database_names(requested_names: List[str]) -> tuple[List[str], List[
         if not matched:
             invalid.append(original_name)
             # Find similar names for suggestions
-            all_searchable = list(AVAILABLE_DATABASES.keys()) + list(DATABASE_ALIASES.keys())
+            all_searchable = [*_ALL_DB_NAMES, *DATABASE_ALIASES]
             similar = find_similar_names(original_name, all_searchable)
             if similar:
                 suggestions.extend(similar)
@@ -232,100 +314,113 @@ def resolve_database_names(requested_names: List[str]) -> tuple[List[str], List[
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events."""
-    global geoip_reader
-    
-    # Startup
-    logger.info(f"Starting GeoIP API Server")
-    logger.info(f"Download URLs: {'S3 pre-signed' if settings.use_s3_urls else 'Local file serving'}")
-    logger.info(f"API Keys configured: {len(settings.api_keys)}")
-    logger.info(f"Cache Type: {settings.cache_type}")
-
-    # Fail fast on invalid configuration (e.g. no API keys, or S3 mode
-    # without a bucket) instead of starting an auth server that silently
-    # rejects every request.
-    validate_settings(settings)
-
-    # Always verify database path exists (needed for query functionality)
-    if not Path(settings.database_path).exists():
-        logger.warning(f"Database path does not exist: {settings.database_path}")
-        Path(settings.database_path).mkdir(parents=True, exist_ok=True)
-        logger.info(f"Created database path: {settings.database_path}")
-        
-    # Check if databases exist, download if not
-    db_path = Path(settings.database_path) / 'raw'
-    maxmind_path = db_path / 'maxmind'
-    ip2location_path = db_path / 'ip2location'
-    
-    # Check if any databases are missing
-    databases_exist = (
-        maxmind_path.exists() and 
-        any(maxmind_path.glob('*.mmdb')) and
-        ip2location_path.exists() and 
-        any(ip2location_path.glob('*.BIN'))
-    )
+    global geoip_reader, _presign_semaphore, _lookup_semaphore, _http_session
     
-    if not databases_exist:
-        logger.info("Databases not found, downloading from S3...")
-        system_state["databases_downloading"] = True
-        system_state["download_start_time"] = datetime.now()
+    try:
+        # Bound concurrent presign/lookup offloads (created here so they bind to the server loop)
+        _presign_semaphore = asyncio.Semaphore(PRESIGN_CONCURRENCY)
+        _lookup_semaphore = asyncio.Semaphore(LOOKUP_CONCURRENCY)
+        
+        # Startup
+        logger.info("Starting GeoIP API Server")
+        logger.info("Download URLs: %s", 'S3 pre-signed' if settings.use_s3_urls else 'Local file serving')
+        logger.info("API Keys configured: %s", len(settings.api_keys))
+        logger.info("Cache Type: %s", settings.cache_type)
+
+        # Fail fast on invalid configuration (e.g. no API keys, or S3 mode
+        # without a bucket) instead of starting an auth server that silently
+        # rejects every request.
+        validate_settings(settings)
+        
+        # Created after validation so a bad configuration doesn't leak it
+        _http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=10,
+                limit_per_host=5,
+                ttl_dns_cache=300,
+                use_dns_cache=True,
+            )
+        )
+        
+        # Always verify database path exists (needed for query functionality)
+        if not Path(settings.database_path).exists():
+            logger.warning("Database path does not exist: %s", settings.database_path)
+            Path(settings.database_path).mkdir(parents=True, exist_ok=True)
+            logger.info("Created database path: %s", settings.database_path)
+        
+        # Check if databases exist, download if not
+        db_path = Path(settings.database_path) / 'raw'
+        maxmind_path = db_path / 'maxmind'
+        ip2location_path = db_path / 'ip2location'
+        
+        # Check if any databases are missing
+        databases_exist = (
+            has_file_with_suffix(maxmind_path, '.mmdb') and
+            has_file_with_suffix(ip2location_path, '.BIN')
+        )
+        
+        if not databases_exist:
+            logger.info("Databases not found, downloading from S3...")
+            system_state["databases_downloading"] = True
+            system_state["download_start_time"] = time.monotonic()
+            try:
+                result = await scheduled_database_update()
+                if result:
+                    successful = sum(result.values())
+                    logger.info("Downloaded %s/%s databases", successful, len(result))
+                else:
+                    logger.warning("Database download returned no results")
+            except Exception as e:
+                logger.error("Failed to download databases at startup: %s", e)
+                logger.warning("Continuing without databases - they will be downloaded on schedule")
+            finally:
+                system_state["databases_downloading"] = False
+                system_state["download_start_time"] = None
+        
+        # Initialize GeoIP reader
         try:
-            import asyncio
-            result = await update_databases()
-            if result:
-                successful = sum(1 for success in result.values() if success)
-                logger.info(f"Downloaded {successful}/{len(result)} databases")
-            else:
-                logger.warning("Database download returned no results")
+            geoip_reader = GeoIPReader()
+            db_status = geoip_reader.get_database_status()
+            logger.info("GeoIP databases loaded: %s", db_status)
         except Exception as e:
-            logger.error(f"Failed to download databases at startup: {e}")
-            logger.warning("Continuing without databases - they will be downloaded on schedule")
-        finally:
-            system_state["databases_downloading"] = False
-            system_state["download_start_time"] = None
-    
-    # Initialize GeoIP reader
-    try:
-        geoip_reader = GeoIPReader()
-        db_status = geoip_reader.get_database_status()
-        logger.info(f"GeoIP databases loaded: {db_status}")
-    except Exception as e:
-        logger.error(f"Failed to initialize GeoIP reader: {e}")
-        logger.warning("GeoIP query functionality will not be available")
-    
-    # Schedule database updates (always needed since we maintain local copies)
-    # Parse cron schedule
-    cron_parts = settings.database_update_schedule.split()
-    if len(cron_parts) == 5:
-        minute, hour, day, month, day_of_week = cron_parts
-        scheduler.add_job(
-                update_databases,
-                CronTrigger(
-                    minute=minute,
-                    hour=hour,
-                    day=day if day != '*' else None,
-                    month=month if month != '*' else None,
-                    day_of_week=day_of_week if day_of_week != '*' else None
-                ),
+            logger.error("Failed to initialize GeoIP reader: %s", e)
+            logger.warning("GeoIP query functionality will not be available")
+        
+        # Schedule database updates (always needed since we maintain local copies)
+        try:
+            update_trigger = CronTrigger.from_crontab(settings.database_update_schedule)
+        except ValueError:
+            logger.warning("Invalid cron schedule: %s", settings.database_update_schedule)
+        else:
+            scheduler.add_job(
+                scheduled_database_update,
+                update_trigger,
                 id='database_update',
                 name='Update GeoIP databases from S3',
-                misfire_grace_time=3600  # 1 hour grace time
+                misfire_grace_time=3600,  # 1 hour grace time
+                max_instances=1,  # Never overlap a slow update with the next run
+                coalesce=True
             )
-        scheduler.start()
-        logger.info(f"Scheduled database updates: {settings.database_update_schedule}")
-    else:
-        logger.warning(f"Invalid cron schedule: {settings.database_update_schedule}")
-    
-    yield
-    
-    # Shutdown
-    logger.info("Shutting down GeoIP API Server")
-    
-    # Stop scheduler
-    if scheduler.running:
-        scheduler.shutdown(wait=False)
-    
-    # Close cache
-    await cache.close()
+            scheduler.start()
+            logger.info("Scheduled database updates: %s", settings.database_update_schedule)
+        
+        yield
+        
+        # Shutdown
+        logger.info("Shutting down GeoIP API Server")
+        
+        # Stop scheduler
+        if scheduler.running:
+            scheduler.shutdown(wait=False)
+        
+        # Close cache
+        await cache.close()
+    finally:
+        # Also runs when startup fails, so the session is closed and queued
+        # log records (including the error) are flushed
+        if _http_session is not None:
+            await _http_session.close()
+        log_listener.stop()
 
 
 # Create FastAPI app
@@ -333,12 +428,40 @@ app = FastAPI(
     title="GeoIP Authentication API",
     description="Docker-deployable GeoIP database authentication and serving",
     version="1.1.3",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
+class LazySessionMiddleware(SessionMiddleware):
+    """
+    SessionMiddleware that skips cookie work for requests without a session.
+    
+    Header-authenticated traffic (CLI clients, the web UI) sends no session
+    cookie; those requests get an empty, non-persisted session instead of a
+    signature check and a freshly signed Set-Cookie. The login/logout
+    endpoints always run the full middleware since they manage the cookie.
+    """
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] not in SESSION_PATHS:
+            cookie_prefix = self.session_cookie.encode() + b"="
+            has_cookie = any(
+                name == b"cookie" and cookie_prefix in value
+                for name, value in scope["headers"]
+            )
+            if not has_cookie:
+                scope["session"] = {}
+                await self.app(scope, receive, send)
+                return
+        await super().__call__(scope, receive, send)
+
+
+# Paths that always go through full session handling
+SESSION_PATHS = frozenset({"/login", "/logout"})
+
 # Configure middleware
 app.add_middleware(
-    SessionMiddleware,
+    LazySessionMiddleware,
     secret_key=settings.session_secret_key,
     session_cookie="geoip_session",
     max_age=86400,  # 24 hours
@@ -394,12 +517,28 @@ class MetricsResponse(BaseModel):
 
 
 # Metrics tracking
-metrics = {
-    "total_requests": 0,
-    "successful_requests": 0,
-    "failed_requests": 0,
-    "start_time": datetime.now()
-}
+class RequestMetrics:
+    """
+    Request counters.
+    
+    Counters are only mutated from the event loop thread, so plain slotted
+    int attributes are safe and avoid dict lookups on every increment.
+    """
+    
+    __slots__ = ("total_requests", "successful_requests", "failed_requests", "start_time")
+    
+    def __init__(self):
+        self.total_requests = 0
+        self.successful_requests = 0
+        self.failed_requests = 0
+        self.start_time = time.monotonic()
+    
+    def uptime_seconds(self) -> float:
+        """Seconds since the server started."""
+        return time.monotonic() - self.start_time
+
+
+metrics = RequestMetrics()
 
 # Track system state for readiness
 system_state = {
@@ -408,38 +547,226 @@ system_state = {
     "download_progress": {}
 }
 
+class DatabaseFileResponse(FileResponse):
+    """FileResponse that streams in 1 MiB chunks (Starlette defaults to 64 KiB)."""
+    
+    chunk_size = 1024 * 1024
+
+
+# Cached stat results and response headers for /download, keyed by database name
+_FILE_META: Dict[str, tuple[os.stat_result, Dict[str, str]]] = {}
+
+# Index of local database files (relative paths), refreshed after updates and
+# lazily every LOCAL_INDEX_TTL seconds so request paths avoid a stat() per file
+LOCAL_INDEX_TTL = 10
+_local_db_index: set[str] = set()
+_local_index_ts = 0.0
+
+# /admin/databases/info results per directory: (dir mtime_ns, scanned at, files)
+DB_INFO_TTL = 5
+_db_info_cache: Dict[str, tuple[int, float, Dict[str, Dict[str, Any]]]] = {}
+
+# Lock file (inside database_path) that serializes updates across worker processes
+UPDATE_LOCK_FILE = '.update.lock'
+IS_WINDOWS = platform.system() == 'Windows'
+
+# Cached S3 availability for /health (refreshed every HEALTH_CACHE_TTL seconds
+# and cleared after each database update). The lock lets concurrent probes
+# share a single refresh instead of each hitting S3.
+_health_cache: Dict[str, Any] = {"ts": 0.0, "data": None}
+_health_cache_lock = asyncio.Lock()
+
+# Pre-signed URLs keyed by (database, bucket) -> (reuse deadline, url). A URL is
+# handed out until half its expiry has elapsed, so clients always get at least
+# url_expiry_seconds / 2 of validity while /auth skips SigV4 signing
+_PRESIGNED_URL_CACHE: Dict[tuple[str, str], tuple[float, str]] = {}
+
+# Cached ISO timestamp (second resolution) so frequent health probes don't
+# allocate and format a datetime on every hit
+_TS_CACHE = [0, ""]
+
+
+def format_local_timestamp(timestamp: float) -> str:
+    """Format a Unix timestamp as a local ISO 8601 string (second resolution) without a datetime."""
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(timestamp))
+
+
+def get_cached_timestamp() -> str:
+    """Return the current ISO timestamp, recomputed at most once per second."""
+    now = int(time.time())
+    if now != _TS_CACHE[0]:
+        _TS_CACHE[1] = format_local_timestamp(now)
+        _TS_CACHE[0] = now
+    return _TS_CACHE[1]
+
+
+def hash_api_key(api_key: str) -> bytes:
+    """Fixed-length digest of an API key used for set membership checks."""
+    return hashlib.blake2b(api_key.encode(), digest_size=32).digest()
+
+
+def build_api_key_digests(api_keys: Iterable[str]) -> frozenset[bytes]:
+    """Build the frozenset of API key digests from the configured keys."""
+    return frozenset(hash_api_key(key) for key in api_keys)
+
 
 def validate_api_key(api_key: Optional[str]) -> bool:
-    """Validate API key against allowed list."""
-    if not api_key or not settings.api_keys:
+    """
+    Validate API key against allowed list.
+    
+    The candidate is digested first and looked up in a frozenset: O(1) in the
+    number of keys, and lookup timing depends on the digest rather than on how
+    much of a real key the candidate shares.
+    """
+    if not api_key or not _API_KEY_DIGESTS:
         return False
     
-    return api_key in settings.api_keys
+    return hash_api_key(api_key) in _API_KEY_DIGESTS
 
 
-def get_local_file_url(database_name: str, request: Request) -> Optional[str]:
+# Digests of the configured API keys (rebuilt on /admin/reload-keys)
+_API_KEY_DIGESTS = build_api_key_digests(settings.api_keys_set)
+
+
+# Encoded once so admin checks skip the settings lookup and re-encoding
+_ADMIN_KEY_BYTES = (settings.admin_key or "").encode()
+
+
+def validate_admin_key(admin_key: Optional[str]) -> bool:
+    """Validate admin key using constant-time comparison."""
+    if not admin_key or not _ADMIN_KEY_BYTES:
+        return False
+    
+    return hmac.compare_digest(admin_key.encode(), _ADMIN_KEY_BYTES)
+
+
+async def require_admin_key(x_admin_key: Optional[str] = Header(None)) -> None:
+    """Dependency guarding admin endpoints; rejects requests without a valid X-Admin-Key."""
+    if not validate_admin_key(x_admin_key):
+        raise HTTPException(status_code=401, detail="Invalid admin key")
+
+
+def canonical_ip(ip: str) -> Optional[str]:
+    """
+    Validate an IPv4/IPv6 address (C-level inet_pton) and return its canonical text form.
+    
+    Equivalent spellings (e.g. IPv6 case or zero compression) normalize to the
+    same string, so they share cache entries. Returns None if invalid.
+    """
+    family = socket.AF_INET6 if ':' in ip else socket.AF_INET
+    try:
+        return socket.inet_ntop(family, socket.inet_pton(family, ip))
+    except (OSError, ValueError):
+        return None
+
+
+def parse_ip_list(ips: str, limit: int) -> List[str]:
+    """Split a comma-separated IP string into unique, non-empty entries (at most limit)."""
+    seen = set()
+    ip_list = []
+    for raw in ips.split(','):
+        ip = raw.strip()
+        if ip and ip not in seen:
+            seen.add(ip)
+            ip_list.append(ip)
+            if len(ip_list) >= limit:
+                break
+    return ip_list
+
+
+@lru_cache(maxsize=32)
+def build_base_url(scheme: str, host: str, root_path: str) -> str:
+    """Build a base URL (no trailing slash) once per distinct scheme/host/root path."""
+    return f"{scheme}://{host}{root_path}".rstrip('/')
+
+
+def get_base_url(request: Request) -> str:
+    """Get the request base URL without a trailing slash, avoiding a URL rebuild per call."""
+    host = request.headers.get('host')
+    if not host:
+        return str(request.base_url).rstrip('/')
+    return build_base_url(request.scope['scheme'], host, request.scope.get('root_path', ''))
+
+
+def get_local_file_url(database_name: str, base_url: str) -> Optional[str]:
     """Generate URL for local file serving."""
-    if database_name not in AVAILABLE_DATABASES:
+    db_meta = _DB_META.get(database_name)
+    if db_meta is None:
         return None
     
     # Check if file exists locally
-    relative_path = AVAILABLE_DATABASES[database_name]
-    local_file = Path(settings.database_path) / relative_path
-    
-    if local_file.exists():
+    if db_meta[1] in get_local_index():
         # Generate download URL
-        base_url = str(request.base_url).rstrip('/')
         return f"{base_url}/download/{database_name}"
     
     return None
 
 
+def get_file_meta(database_name: str, local_file: Path) -> Optional[tuple[os.stat_result, Dict[str, str]]]:
+    """
+    Get cached stat result and download headers for a local database file.
+    
+    A single stat() per call detects replaced files; headers are only rebuilt
+    when size or mtime change.
+    
+    Returns:
+        tuple: (stat_result, headers), or None if the file does not exist
+    """
+    try:
+        stat_result = os.stat(local_file)
+    except OSError:
+        _FILE_META.pop(database_name, None)
+        return None
+    
+    cached = _FILE_META.get(database_name)
+    if (cached and cached[0].st_mtime_ns == stat_result.st_mtime_ns
+            and cached[0].st_size == stat_result.st_size):
+        return cached
+    
+    headers = {
+        "Content-Length": str(stat_result.st_size),
+        "Content-Disposition": f'attachment; filename="{database_name}"',
+        "ETag": f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"',
+        # Downloads need an API key, so shared caches must not store them
+        "Cache-Control": f"private, max-age={settings.url_expiry_seconds}",
+        "Vary": "X-API-Key"
+    }
+    _FILE_META[database_name] = (stat_result, headers)
+    return _FILE_META[database_name]
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an If-None-Match header value (list, weak or '*') against an ETag."""
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def get_cached_presigned_url(database_name: str) -> Optional[str]:
+    """Return a previously signed URL that still has at least half its lifetime left."""
+    entry = _PRESIGNED_URL_CACHE.get((database_name, settings.s3_bucket))
+    if entry is not None and time.monotonic() < entry[0]:
+        return entry[1]
+    return None
+
+
 def generate_s3_presigned_url(database_name: str) -> Optional[str]:
     """Generate S3 pre-signed URL for database."""
-    if not s3_client or database_name not in AVAILABLE_DATABASES:
+    db_meta = _DB_META.get(database_name)
+    if not s3_client or db_meta is None:
         return None
     
-    s3_key = AVAILABLE_DATABASES[database_name]
+    cached_url = get_cached_presigned_url(database_name)
+    if cached_url is not None:
+        return cached_url
+    
+    s3_key = db_meta[1]
     
     try:
         url = s3_client.generate_presigned_url(
@@ -450,85 +777,312 @@ def generate_s3_presigned_url(database_name: str) -> Optional[str]:
             },
             ExpiresIn=settings.url_expiry_seconds
         )
+        _PRESIGNED_URL_CACHE[(database_name, settings.s3_bucket)] = (
+            time.monotonic() + settings.url_expiry_seconds / 2, url
+        )
         return url
     except Exception as e:
-        logger.error(f"Error generating S3 URL for {database_name}: {str(e)}")
+        logger.error("Error generating S3 URL for %s: %s", database_name, e)
         return None
 
 
-def generate_database_urls(databases: List[str], request: Request) -> Dict[str, str]:
-    """Generate URLs for requested databases based on configuration."""
+async def generate_s3_presigned_url_async(database_name: str) -> Optional[str]:
+    """Generate an S3 pre-signed URL in a worker thread, bounded by a semaphore."""
+    # Cache hits need no signing work, so skip the thread hop entirely
+    cached_url = get_cached_presigned_url(database_name)
+    if cached_url is not None:
+        return cached_url
+    
+    if _presign_semaphore is None:
+        return await asyncio.to_thread(generate_s3_presigned_url, database_name)
+    
+    async with _presign_semaphore:
+        return await asyncio.to_thread(generate_s3_presigned_url, database_name)
+
+
+async def query_ips_async(ips: List[str], full_data: bool) -> List[Optional[Dict[str, Any]]]:
+    """Look up a batch of IPs in one worker thread, bounded by a semaphore."""
+    if _lookup_semaphore is None:
+        return await asyncio.to_thread(geoip_reader.query_batch, ips, full_data)
+    
+    async with _lookup_semaphore:
+        return await asyncio.to_thread(geoip_reader.query_batch, ips, full_data)
+
+
+async def generate_database_urls(databases: Sequence[str], base_url: str) -> Dict[str, str]:
+    """
+    Generate URLs for requested databases based on configuration.
+    
+    Args:
+        databases: Database names to generate URLs for
+        base_url: Server base URL without trailing slash (local file serving only)
+    """
     urls = {}
+    names = [db_name for db_name in databases if db_name in _AVAILABLE_SET]
     
-    for db_name in databases:
-        if db_name not in AVAILABLE_DATABASES:
-            continue
-        
-        url = None
-        
-        if settings.use_s3_urls:
-            # Generate S3 pre-signed URLs for scalability
-            url = generate_s3_presigned_url(db_name)
-        else:
-            # Serve files directly from local storage
-            url = get_local_file_url(db_name, request)
-        
+    if settings.use_s3_urls:
+        # Generate S3 pre-signed URLs for scalability, signed concurrently
+        generated = await asyncio.gather(*[
+            generate_s3_presigned_url_async(db_name) for db_name in names
+        ])
+    else:
+        # Serve files directly from local storage
+        generated = [get_local_file_url(db_name, base_url) for db_name in names]
+    
+    for db_name, url in zip(names, generated):
         if url:
             urls[db_name] = url
-            logger.debug(f"Generated URL for {db_name}: {url[:50]}...")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Generated URL for %s: %s...", db_name, url[:50])
     
     return urls
 
 
-@app.get("/health", response_model=HealthResponse)
+def scan_local_databases() -> set[str]:
+    """
+    Scan the database directories once and return the relative paths present.
+    
+    One scandir() per provider directory replaces a stat() per database.
+    """
+    present = set()
+    raw_path = os.path.join(settings.database_path, 'raw')
+    for provider in ('maxmind', 'ip2location'):
+        try:
+            with os.scandir(os.path.join(raw_path, provider)) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        present.add(f"raw/{provider}/{entry.name}")
+        except OSError:
+            continue
+    return present
+
+
+def has_file_with_suffix(directory: Path, suffix: str) -> bool:
+    """Return True if the directory holds at least one file ending in suffix (stops at first match)."""
+    try:
+        with os.scandir(directory) as entries:
+            return any(entry.name.endswith(suffix) and entry.is_file() for entry in entries)
+    except OSError:
+        return False
+
+
+def scan_database_files(directory: str, suffix: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Describe the database files with the given suffix in a directory.
+    
+    Returns None if the directory does not exist. Uses os.scandir so each file
+    costs a single stat() and no Path objects are built. Results are reused for
+    DB_INFO_TTL seconds while the directory mtime is unchanged (updates replace
+    files by rename, which bumps it).
+    """
+    try:
+        dir_mtime = os.stat(directory).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    
+    cached = _db_info_cache.get(directory)
+    if cached is not None and cached[0] == dir_mtime and time.monotonic() - cached[1] < DB_INFO_TTL:
+        return cached[2]
+    
+    try:
+        entries = os.scandir(directory)
+    except FileNotFoundError:
+        return None
+    
+    files = {}
+    with entries:
+        for entry in entries:
+            if not entry.name.endswith(suffix):
+                continue
+            stat = entry.stat()
+            size = stat.st_size
+            files[entry.name] = {
+                "size_bytes": size,
+                "size_mb": round(size / 1048576, 2),
+                "modified": format_local_timestamp(stat.st_mtime),
+                "path": entry.path
+            }
+    _db_info_cache[directory] = (dir_mtime, time.monotonic(), files)
+    return files
+
+
+def check_s3_object(db_name: str, rel_path: str) -> bool:
+    """Check whether a database object exists in S3 (HEAD request, no data transfer)."""
+    try:
+        s3_client.head_object(Bucket=settings.s3_bucket, Key=rel_path)
+        return True
+    except ClientError as e:
+        # Object doesn't exist or access denied
+        if e.response['Error']['Code'] not in ['404', 'NoSuchKey', 'Forbidden', '403']:
+            logger.debug("S3 error checking %s: %s", db_name, e)
+    except Exception as e:
+        logger.debug("Error checking S3 database %s: %s", db_name, e)
+    return False
+
+
+def list_s3_database_keys() -> set[str]:
+    """List all object keys under raw/ in the bucket (one request per 1000 keys)."""
+    keys = set()
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=settings.s3_bucket, Prefix='raw/'):
+        keys.update(obj['Key'] for obj in page.get('Contents', []))
+    return keys
+
+
+async def get_remote_availability() -> Dict[str, bool]:
+    """
+    Get S3 availability per database, reusing results for HEALTH_CACHE_TTL seconds.
+    
+    Concurrent callers with a stale cache wait on one shared refresh.
+    """
+    if not s3_client:
+        return dict.fromkeys(AVAILABLE_DATABASES, False)
+    
+    cached = _health_cache["data"]
+    if cached is not None and time.monotonic() - _health_cache["ts"] < settings.health_cache_ttl:
+        return cached
+    
+    async with _health_cache_lock:
+        # Another request may have refreshed the cache while we waited
+        cached = _health_cache["data"]
+        if cached is not None and time.monotonic() - _health_cache["ts"] < settings.health_cache_ttl:
+            return cached
+        remote_exists = await fetch_remote_availability()
+        if remote_exists is not None:
+            _health_cache["ts"] = time.monotonic()
+            _health_cache["data"] = remote_exists
+            return remote_exists
+    return dict.fromkeys(AVAILABLE_DATABASES, False)
+
+
+async def fetch_remote_availability() -> Optional[Dict[str, bool]]:
+    """
+    Query S3 for database availability; returns None if S3 is unreachable.
+    
+    A single ListObjectsV2 listing covers every database. If listing is not
+    permitted (no s3:ListBucket), falls back to concurrent HEAD requests.
+    """
+    try:
+        try:
+            remote_keys = await asyncio.to_thread(list_s3_database_keys)
+            remote_exists = {
+                db_name: rel_path in remote_keys
+                for db_name, rel_path in AVAILABLE_DATABASES.items()
+            }
+        except ClientError as e:
+            logger.debug("S3 listing unavailable, falling back to HEAD requests: %s", e)
+            checks = await asyncio.gather(*[
+                asyncio.to_thread(check_s3_object, db_name, rel_path)
+                for db_name, rel_path in AVAILABLE_DATABASES.items()
+            ])
+            remote_exists = dict(zip(AVAILABLE_DATABASES, checks))
+    except Exception as e:
+        logger.warning("Failed to check S3 database availability: %s", e)
+        return None
+    return remote_exists
+
+
+def invalidate_remote_availability() -> None:
+    """Drop cached S3 availability so the next /health call re-checks S3."""
+    _health_cache["data"] = None
+
+
+def refresh_local_index() -> set[str]:
+    """Rescan the database directories and replace the local file index."""
+    global _local_db_index, _local_index_ts
+    _local_db_index = scan_local_databases()
+    _local_index_ts = time.monotonic()
+    return _local_db_index
+
+
+def get_local_index() -> set[str]:
+    """Get the set of local database relative paths, rescanning when stale."""
+    if time.monotonic() - _local_index_ts >= LOCAL_INDEX_TTL:
+        return refresh_local_index()
+    return _local_db_index
+
+
+async def get_database_updater() -> DatabaseUpdater:
+    """Get the DatabaseUpdater shared by admin endpoints, creating it on first use."""
+    global _database_updater
+    if _database_updater is None:
+        # Building the boto3 client loads service models, so do it in a worker thread
+        _database_updater = await asyncio.to_thread(DatabaseUpdater)
+    return _database_updater
+
+
+def lock_update_file(lock_fd: int) -> None:
+    """Block until this process holds the exclusive database update lock."""
+    import fcntl  # POSIX only; callers skip locking when IS_WINDOWS
+    fcntl.flock(lock_fd, fcntl.LOCK_EX)
+
+
+async def scheduled_database_update() -> Dict[str, bool]:
+    """
+    Update databases from S3 and refresh the local file index and S3 availability.
+    
+    With several uvicorn workers every process fires the scheduled job, so
+    updates are serialized through a lock file in the database directory.
+    A worker that gets the lock after another worker finished an update
+    only reloads its reader instead of downloading everything again.
+    
+    flock is POSIX only; on Windows the update runs unserialized.
+    """
+    if IS_WINDOWS:
+        try:
+            return await update_databases()
+        finally:
+            refresh_local_index()
+            invalidate_remote_availability()
+    
+    lock_path = os.path.join(settings.database_path, UPDATE_LOCK_FILE)
+    lock_fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        seen_mtime = os.fstat(lock_fd).st_mtime_ns
+        await asyncio.to_thread(lock_update_file, lock_fd)
+        
+        if os.fstat(lock_fd).st_mtime_ns != seen_mtime:
+            logger.info("Databases were updated by another worker, reloading only")
+            if geoip_reader:
+                geoip_reader.reload_databases()
+            local_files = refresh_local_index()
+            return {
+                db_name: rel_path in local_files
+                for db_name, rel_path in AVAILABLE_DATABASES.items()
+            }
+        
+        results = await update_databases()
+        os.utime(lock_fd)  # Tell waiting workers an update just completed
+        return results
+    finally:
+        os.close(lock_fd)  # Also releases the lock
+        refresh_local_index()
+        invalidate_remote_availability()
+
+
+# Response models are kept for the OpenAPI schema only; the handlers return
+# plain dicts so trusted, fixed-shape bodies skip Pydantic validation
+@app.get("/health", response_class=ORJSONResponse, responses={200: {"model": HealthResponse}})
 async def health_check():
     """Health check endpoint."""
-    local_count = 0
-    remote_count = 0
-    
     # Always check local database availability
-    for db_name, rel_path in AVAILABLE_DATABASES.items():
-        local_file = Path(settings.database_path) / rel_path
-        if local_file.exists():
-            local_count += 1
+    local_files = get_local_index()
+    local_set = {
+        db_name for db_name, rel_path in AVAILABLE_DATABASES.items()
+        if rel_path in local_files
+    }
     
     # Always check remote (S3) database availability
-    if s3_client:
-        try:
-            for db_name, rel_path in AVAILABLE_DATABASES.items():
-                try:
-                    # Use HEAD request to check if object exists (fast, no data transfer)
-                    s3_client.head_object(
-                        Bucket=settings.s3_bucket,
-                        Key=rel_path
-                    )
-                    remote_count += 1
-                except ClientError as e:
-                    # Object doesn't exist or access denied
-                    if e.response['Error']['Code'] not in ['404', 'NoSuchKey', 'Forbidden', '403']:
-                        logger.debug(f"S3 error checking {db_name}: {e}")
-                except Exception as e:
-                    logger.debug(f"Error checking S3 database {db_name}: {e}")
-        except Exception as e:
-            logger.warning(f"Failed to check S3 database availability: {e}")
+    remote_exists = await get_remote_availability()
+    remote_set = {db_name for db_name, exists in remote_exists.items() if exists}
+    
+    local_count = len(local_set)
+    remote_count = len(remote_set)
     
     # Calculate total unique databases available
-    # This is the count of databases available from either local OR remote sources
-    total_available = 0
-    for db_name, rel_path in AVAILABLE_DATABASES.items():
-        local_file = Path(settings.database_path) / rel_path
-        local_exists = local_file.exists()
-        
-        remote_exists = False
-        if s3_client:
-            try:
-                s3_client.head_object(Bucket=settings.s3_bucket, Key=rel_path)
-                remote_exists = True
-            except:
-                pass
-        
-        if local_exists or remote_exists:
-            total_available += 1
+    # This is the count of databases available from either local OR remote sources,
+    # derived from the single pass above
+    total_available = len(local_set | remote_set)
     
     # Determine system status based on database availability
     system_status = "healthy"
@@ -545,16 +1099,16 @@ async def health_check():
     elif local_count == 0 and settings.use_s3_urls:
         readiness_status = "ready"  # S3 mode
     
-    return HealthResponse(
-        status=system_status,
-        timestamp=datetime.now().isoformat(),
-        use_s3_urls=settings.use_s3_urls,
-        databases_available=total_available,
-        databases_local=local_count,
-        databases_remote=remote_count,
-        readiness=readiness_status,
-        download_in_progress=system_state.get("databases_downloading", False)
-    )
+    return ORJSONResponse({
+        "status": system_status,
+        "timestamp": get_cached_timestamp(),
+        "use_s3_urls": settings.use_s3_urls,
+        "databases_available": total_available,
+        "databases_local": local_count,
+        "databases_remote": remote_count,
+        "readiness": readiness_status,
+        "download_in_progress": system_state.get("databases_downloading", False)
+    })
 
 
 @app.get("/ready", response_model=ReadinessResponse)
@@ -564,9 +1118,9 @@ async def readiness_check():
     local_count = 0
     expected_count = len(AVAILABLE_DATABASES)
     
-    for db_name, rel_path in AVAILABLE_DATABASES.items():
-        local_file = Path(settings.database_path) / rel_path
-        if local_file.exists():
+    local_files = get_local_index()
+    for rel_path in AVAILABLE_DATABASES.values():
+        if rel_path in local_files:
             local_count += 1
     
     # Determine readiness status
@@ -578,7 +1132,7 @@ async def readiness_check():
         status = "downloading"
         ready = False
         if system_state.get("download_start_time"):
-            elapsed = (datetime.now() - system_state["download_start_time"]).total_seconds()
+            elapsed = time.monotonic() - system_state["download_start_time"]
             details = f"Downloading databases for {elapsed:.0f} seconds"
     elif local_count == 0:
         # No local databases and not downloading
@@ -605,7 +1159,7 @@ async def readiness_check():
     return ReadinessResponse(
         ready=ready,
         status=status,
-        timestamp=datetime.now().isoformat(),
+        timestamp=get_cached_timestamp(),
         databases_local=local_count,
         databases_expected=expected_count,
         download_in_progress=system_state.get("databases_downloading", False),
@@ -613,20 +1167,20 @@ async def readiness_check():
     )
 
 
-@app.get("/metrics", response_model=MetricsResponse)
+@app.get("/metrics", response_class=ORJSONResponse, responses={200: {"model": MetricsResponse}})
 async def get_metrics(x_api_key: Optional[str] = Header(None)):
     """Metrics endpoint (requires API key)."""
     if not validate_api_key(x_api_key):
         raise HTTPException(status_code=401, detail="Invalid API key")
     
-    uptime = (datetime.now() - metrics["start_time"]).total_seconds()
+    uptime = metrics.uptime_seconds()
     
-    return MetricsResponse(
-        total_requests=metrics["total_requests"],
-        successful_requests=metrics["successful_requests"],
-        failed_requests=metrics["failed_requests"],
-        uptime_seconds=uptime
-    )
+    return ORJSONResponse({
+        "total_requests": metrics.total_requests,
+        "successful_requests": metrics.successful_requests,
+        "failed_requests": metrics.failed_requests,
+        "uptime_seconds": uptime
+    })
 
 
 @app.post("/auth")
@@ -636,23 +1190,24 @@ async def authenticate(
     x_api_key: Optional[str] = Header(None)
 ):
     """Main authentication endpoint - compatible with Lambda version."""
-    metrics["total_requests"] += 1
+    metrics.total_requests += 1
     
     # Validate API key
     if not validate_api_key(x_api_key):
-        metrics["failed_requests"] += 1
-        logger.warning(f"Invalid API key attempt from {request.client.host}")
+        metrics.failed_requests += 1
+        client_host = request.client.host if request.client else "unknown"
+        logger.warning("Invalid API key attempt from %s", client_host)
         raise HTTPException(status_code=401, detail="Invalid API key")
     
     # Determine which databases to return using smart resolver
     if body.databases == "all":
-        databases = list(AVAILABLE_DATABASES.keys())
+        databases = _ALL_DB_NAMES
     elif isinstance(body.databases, list):
         # Use smart resolver for flexible database name matching
         resolved_databases, invalid_names, suggestions = resolve_database_names(body.databases)
         
         if invalid_names:
-            metrics["failed_requests"] += 1
+            metrics.failed_requests += 1
             error_msg = f"Invalid database names: {', '.join(invalid_names)}"
             if suggestions:
                 error_msg += f". Did you mean: {', '.join(set(suggestions[:5]))}"
@@ -661,24 +1216,27 @@ async def authenticate(
         
         databases = resolved_databases
         if not databases:
-            metrics["failed_requests"] += 1
+            metrics.failed_requests += 1
             raise HTTPException(status_code=400, detail="No valid databases in request")
     else:
-        metrics["failed_requests"] += 1
+        metrics.failed_requests += 1
         raise HTTPException(status_code=400, detail='databases parameter must be "all" or an array')
     
+    # Resolve the base URL once per request (only needed for local file serving)
+    base_url = "" if settings.use_s3_urls else get_base_url(request)
+    
     # Generate URLs
-    urls = generate_database_urls(databases, request)
+    urls = await generate_database_urls(databases, base_url)
     
     if not urls:
-        metrics["failed_requests"] += 1
+        metrics.failed_requests += 1
         logger.error("Failed to generate any download URLs")
         raise HTTPException(status_code=500, detail="Failed to generate download URLs")
     
-    metrics["successful_requests"] += 1
-    logger.info(f"Successful auth request for {len(urls)} databases")
+    metrics.successful_requests += 1
+    logger.info("Successful auth request for %d databases", len(urls))
     
-    return JSONResponse(content=urls)
+    return ORJSONResponse(content=urls)
 
 
 @app.get("/databases")
@@ -774,44 +1332,72 @@ async def list_databases():
     }
 
 
-@app.get("/download/{database_name}")
+@app.get("/download/{database_name:dbname}")
 async def download_database(
     database_name: str,
-    x_api_key: Optional[str] = Header(None)
+    x_api_key: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
 ):
     """Direct file download endpoint."""
     # Validate API key
     if not validate_api_key(x_api_key):
-        logger.warning(f"Invalid API key for download: {database_name}")
+        logger.warning("Invalid API key for download: %s", database_name)
         raise HTTPException(status_code=401, detail="Invalid API key")
     
-    # Use smart resolver to find the actual database name
-    resolved_databases, invalid_names, suggestions = resolve_database_names([database_name])
-    
-    if invalid_names or not resolved_databases:
-        error_msg = f"Database not found: {database_name}"
-        if suggestions:
-            error_msg += f". Did you mean: {', '.join(set(suggestions[:3]))}"
-        error_msg += f". Use GET /databases to see all available databases."
-        raise HTTPException(status_code=404, detail=error_msg)
-    
-    # Use the first resolved database name (should only be one for single input)
-    actual_database_name = resolved_databases[0]
+    if database_name in _AVAILABLE_SET:
+        # Exact name, no resolution needed
+        actual_database_name = database_name
+    else:
+        # Use smart resolver to find the actual database name
+        resolved_databases, invalid_names, suggestions = resolve_database_names([database_name])
+        
+        if invalid_names or not resolved_databases:
+            error_msg = f"Database not found: {database_name}"
+            if suggestions:
+                error_msg += f". Did you mean: {', '.join(set(suggestions[:3]))}"
+            error_msg += f". Use GET /databases to see all available databases."
+            raise HTTPException(status_code=404, detail=error_msg)
+        
+        # Use the first resolved database name (should only be one for single input)
+        actual_database_name = resolved_databases[0]
     
     # Get local file path
-    relative_path = AVAILABLE_DATABASES[actual_database_name]
-    local_file = Path(settings.database_path) / relative_path
+    local_file = _DB_META[actual_database_name][0]
     
-    if not local_file.exists():
-        logger.error(f"File not found: {local_file}")
+    file_meta = get_file_meta(actual_database_name, local_file)
+    if file_meta is None:
+        logger.error("File not found: %s", local_file)
         raise HTTPException(status_code=404, detail="Database file not found")
     
-    logger.info(f"Serving file: {actual_database_name} (requested as: {database_name})")
+    stat_result, headers = file_meta
+    
+    # Conditional GET: clients polling for updates skip the transfer entirely
+    if if_none_match and etag_matches(if_none_match, headers["ETag"]):
+        return Response(
+            status_code=304,
+            headers={
+                "ETag": headers["ETag"],
+                "Cache-Control": headers["Cache-Control"],
+                "Vary": headers["Vary"]
+            }
+        )
+    
+    logger.info("Serving file: %s (requested as: %s)", actual_database_name, database_name)
+    
+    # Behind nginx, hand the transfer off via X-Accel-Redirect so the file is
+    # sent with sendfile(2) instead of being copied through Python
+    if settings.download_accel_redirect:
+        accel_headers = {k: v for k, v in headers.items() if k != "Content-Length"}
+        accel_headers["X-Accel-Redirect"] = (
+            f"{settings.download_accel_redirect.rstrip('/')}/{_DB_META[actual_database_name][1]}"
+        )
+        return Response(headers=accel_headers, media_type='application/octet-stream')
     
-    return FileResponse(
+    return DatabaseFileResponse(
         path=local_file,
-        filename=actual_database_name,  # Use the actual filename for download
-        media_type='application/octet-stream'
+        headers=headers,  # Precomputed Content-Length/Content-Disposition/ETag
+        media_type='application/octet-stream',
+        stat_result=stat_result
     )
 
 
@@ -863,66 +1449,78 @@ async def query_ips(
     2. X-API-Key header
     3. api_key query parameter
     """
-    metrics["total_requests"] += 1
+    metrics.total_requests += 1
     
     # Check authentication (session -> header -> query param)
     session_key = request.session.get("api_key") if hasattr(request.session, "get") else None
     auth_key = session_key or x_api_key or api_key
     
     if not validate_api_key(auth_key):
-        metrics["failed_requests"] += 1
-        logger.warning(f"Invalid API key attempt for query from {request.client.host}")
+        metrics.failed_requests += 1
+        client_host = request.client.host if request.client else "unknown"
+        logger.warning("Invalid API key attempt for query from %s", client_host)
         raise HTTPException(status_code=401, detail="Invalid API key")
     
-    # Store API key in session for web UI
-    if not session_key and auth_key:
-        request.session["api_key"] = auth_key
-    
     # Check if GeoIP reader is available
     if not geoip_reader:
         raise HTTPException(status_code=503, detail="GeoIP service not available")
     
-    # Parse and validate IPs
-    ip_list = [ip.strip() for ip in ips.split(',')][:settings.query_rate_limit]
+    # Parse IPs: drop blanks and duplicates, stop at the rate limit
+    ip_list = parse_ip_list(ips, settings.query_rate_limit)
     
     if not ip_list:
         raise HTTPException(status_code=400, detail="No IP addresses provided")
     
-    results = {}
+    # Pre-seed keys so the response keeps the request order
+    results: Dict[str, Any] = dict.fromkeys(ip_list)
+    valid_ips = []
+    cache_keys = []
     
     for ip in ip_list:
-        # Validate IP format
-        try:
-            ipaddress.ip_address(ip)
-        except ValueError:
+        # Validate IP format; cache on the canonical form
+        canonical = canonical_ip(ip)
+        if canonical is None:
             results[ip] = {"error": "Invalid IP address"}
             continue
-        
-        # Check cache
-        cache_key = f"{ip}:{full_data}"
-        cached = await cache.get(cache_key)
+        valid_ips.append(ip)
+        cache_keys.append(f"{canonical}:{full_data}")
+    
+    # Check cache for all IPs in one batch
+    cached_values = await cache.mget(cache_keys)
+    to_cache = {}
+    
+    misses = []
+    for ip, cache_key, cached in zip(valid_ips, cache_keys, cached_values):
         if cached:
             results[ip] = cached
-            continue
-        
-        # Query databases
+        else:
+            misses.append((ip, cache_key))
+    
+    # Query databases for all cache misses in one sorted batch
+    lookups: List[Any] = []
+    if misses:
         try:
-            data = await geoip_reader.query(ip, full_data)
-            if data:
-                await cache.set(cache_key, data)
-                results[ip] = data
-            else:
-                not_found = {"error": "Not found"}
-                await cache.set(cache_key, not_found)
-                results[ip] = not_found
+            lookups = await query_ips_async([ip for ip, _ in misses], full_data)
         except Exception as e:
-            logger.error(f"Error querying {ip}: {e}")
+            lookups = [e] * len(misses)
+    
+    for (ip, cache_key), data in zip(misses, lookups):
+        if isinstance(data, Exception):
+            logger.error("Error querying %s: %s", ip, data)
             results[ip] = {"error": "Query failed"}
+            continue
+        if not data:
+            data = {"error": "Not found"}
+        to_cache[cache_key] = data
+        results[ip] = data
+    
+    # Store all new results in one batch
+    await cache.mset(to_cache)
     
-    metrics["successful_requests"] += 1
-    logger.info(f"Successful query for {len(ip_list)} IPs")
+    metrics.successful_requests += 1
+    logger.info("Successful query for %s IPs", len(ip_list))
     
-    return JSONResponse(content=results)
+    return ORJSONResponse(content=results)
 
 
 @app.post("/login")
@@ -947,39 +1545,20 @@ async def logout(request: Request):
     return {"message": "Logged out successfully"}
 
 
-@app.get("/install", response_class=PlainTextResponse)
-async def get_installer(
-    request: Request,
-    with_cron: bool = Query(False, description="Setup automatic updates via cron"),
-    install_dir: str = Query("/opt/geoip", description="Installation directory"),
-    api_endpoint: Optional[str] = Query(None, description="API endpoint URL")
-):
-    """
-    One-line installer script for GeoIP tools.
-    
-    Usage:
-        curl -sSL https://your-api.com/install | sh
-        
-    With options:
-        curl -sSL "https://your-api.com/install?with_cron=true&install_dir=/usr/local/geoip" | sh
-    """
-    
-    # Use current server as default endpoint if not specified
-    if not api_endpoint:
-        api_endpoint = str(request.base_url).rstrip('/')
-    
-    installer_script = f"""#!/bin/sh
+# Installer script template, encoded once. Placeholders are substituted with
+# bytes.replace() per request so the ~4KB body is never re-encoded.
+_INSTALLER_BYTES = """#!/bin/sh
 # GeoIP Universal Installer
-# Generated by {api_endpoint}/install
+# Generated by __API_ENDPOINT__/install
 # 
 # This script installs GeoIP update tools without requiring Docker
 
 set -e
 
 # Configuration
-INSTALL_DIR="{install_dir}"
-WITH_CRON="{str(with_cron).lower()}"
-API_ENDPOINT="{api_endpoint}"
+INSTALL_DIR="__INSTALL_DIR__"
+WITH_CRON="__WITH_CRON__"
+API_ENDPOINT="__API_ENDPOINT__"
 
 echo "========================================="
 echo "     GeoIP Tools Universal Installer     "
@@ -992,7 +1571,7 @@ echo "  Setup cron: $WITH_CRON"
 echo ""
 
 # Check for required tools
-check_requirements() {{
+check_requirements() {
     local missing=""
     
     if ! command -v curl >/dev/null 2>&1 && ! command -v wget >/dev/null 2>&1; then
@@ -1008,7 +1587,7 @@ check_requirements() {{
         echo "Please install them and try again."
         exit 1
     fi
-}}
+}
 
 check_requirements
 
@@ -1044,7 +1623,7 @@ else
     esac
     
     # Download crane
-    CRANE_URL="https://github.com/google/go-containerregistry/releases/latest/download/go-containerregistry_Linux_${{CRANE_ARCH}}.tar.gz"
+    CRANE_URL="https://github.com/google/go-containerregistry/releases/latest/download/go-containerregistry_Linux_${CRANE_ARCH}.tar.gz"
     
     if command -v curl >/dev/null 2>&1; then
         curl -sL "$CRANE_URL" | tar -xz crane
@@ -1126,7 +1705,54 @@ echo ""
 echo "🔍 To validate databases:"
 echo "   $INSTALL_DIR/validate.sh"
 echo ""
-"""
+""".encode()
+
+# Allowed characters for values substituted into the installer script
+_INSTALL_DIR_PATTERN = re.compile(r"/[A-Za-z0-9._/-]*")
+_API_ENDPOINT_PATTERN = re.compile(r"https?://[A-Za-z0-9._:/\[\]-]+")
+
+
+@lru_cache(maxsize=64)
+def render_installer(with_cron: bool, install_dir: str, api_endpoint: str) -> bytes:
+    """Render the installer script; memoized per (with_cron, install_dir, api_endpoint)."""
+    return (
+        _INSTALLER_BYTES
+        .replace(b"__API_ENDPOINT__", api_endpoint.encode())
+        .replace(b"__INSTALL_DIR__", install_dir.encode())
+        .replace(b"__WITH_CRON__", b"true" if with_cron else b"false")
+    )
+
+
+@app.get("/install", response_class=PlainTextResponse)
+async def get_installer(
+    request: Request,
+    with_cron: bool = Query(False, description="Setup automatic updates via cron"),
+    install_dir: str = Query("/opt/geoip", description="Installation directory"),
+    api_endpoint: Optional[str] = Query(None, description="API endpoint URL")
+):
+    """
+    One-line installer script for GeoIP tools.
+    
+    Usage:
+        curl -sSL https://your-api.com/install | sh
+        
+    With options:
+        curl -sSL "https://your-api.com/install?with_cron=true&install_dir=/usr/local/geoip" | sh
+    """
+    
+    # Use current server as default endpoint if not specified
+    if not api_endpoint:
+        api_endpoint = get_base_url(request)
+    
+    # Values are spliced into a shell script, so only allow safe characters.
+    # The default endpoint is checked too: it comes from the client-supplied
+    # Host / X-Forwarded-* headers.
+    if not _API_ENDPOINT_PATTERN.fullmatch(api_endpoint):
+        raise HTTPException(status_code=400, detail="Invalid api_endpoint")
+    if not _INSTALL_DIR_PATTERN.fullmatch(install_dir):
+        raise HTTPException(status_code=400, detail="Invalid install_dir")
+    
+    installer_script = render_installer(with_cron, install_dir, api_endpoint)
     
     return Response(
         content=installer_script,
@@ -1137,67 +1763,111 @@ echo ""
     )
 
 
+# Settings-derived parts of /admin/status and /admin/config, rebuilt only when
+# the settings object changes (i.e. after /admin/reload-keys)
+_admin_snapshot: Dict[str, Any] = {"settings": None}
+
+
+def get_admin_snapshot() -> Dict[str, Any]:
+    """Get the static admin response sections for the current settings."""
+    if _admin_snapshot["settings"] is settings:
+        return _admin_snapshot
+    
+    config = {
+        "api": {
+            "port": settings.port,
+            "workers": settings.workers,
+            "debug": settings.debug,
+            "api_keys_count": len(settings.api_keys)
+        },
+        "database": {
+            "path": settings.database_path,
+            "update_schedule": settings.database_update_schedule
+        },
+        "s3": {
+            "use_s3_urls": settings.use_s3_urls,
+            "bucket": settings.s3_bucket if settings.use_s3_urls else None,
+            "region": settings.aws_region if settings.use_s3_urls else None,
+            "url_expiry_seconds": settings.url_expiry_seconds if settings.use_s3_urls else None
+        },
+        "cache": {
+            "type": settings.cache_type,
+            "enabled": settings.cache_type != "none"
+        },
+        "admin": {
+            "enabled": settings.enable_admin,
+            "key_configured": bool(settings.admin_key)
+        },
+        "logging": {
+            "level": settings.log_level
+        }
+    }
+    
+    # Add Redis config if using Redis cache
+    if settings.cache_type == "redis" and hasattr(settings, 'redis_url'):
+        config["cache"]["redis_url"] = "***configured***"
+    
+    _admin_snapshot.update(
+        settings=settings,
+        config=config,
+        service={"version": "1.1.3", "debug_mode": settings.debug},
+        cache={
+            "type": settings.cache_type,
+            "enabled": settings.cache_type != "none"
+        },
+        configuration={
+            "use_s3_urls": settings.use_s3_urls,
+            "database_path": settings.database_path,
+            "workers": settings.workers,
+            "port": settings.port
+        }
+    )
+    return _admin_snapshot
+
+
 # Admin endpoints (optional, can be disabled via environment)
 if settings.enable_admin:
-    @app.post("/admin/reload-keys")
-    async def reload_api_keys(
-        x_admin_key: Optional[str] = Header(None)
-    ):
+    @app.post("/admin/reload-keys", dependencies=[Depends(require_admin_key)])
+    async def reload_api_keys():
         """Reload API keys from environment (requires admin key)."""
-        global settings
-        
-        if x_admin_key != settings.admin_key:
-            raise HTTPException(status_code=401, detail="Invalid admin key")
+        global settings, _API_KEY_DIGESTS, _ADMIN_KEY_BYTES
         
         # Reload settings
-        settings = get_settings(force_reload=True)
+        settings = reload_settings()
+        _API_KEY_DIGESTS = build_api_key_digests(settings.api_keys_set)
+        _ADMIN_KEY_BYTES = (settings.admin_key or "").encode()
         
-        logger.info(f"Reloaded API keys, now have {len(settings.api_keys)} keys")
+        logger.info("Reloaded API keys, now have %s keys", len(settings.api_keys))
         
         return {"message": f"Reloaded {len(settings.api_keys)} API keys"}
 
-    @app.post("/admin/update-databases")
-    async def update_databases_endpoint(
-        x_admin_key: Optional[str] = Header(None)
-    ):
+    @app.post("/admin/update-databases", dependencies=[Depends(require_admin_key)])
+    async def update_databases_endpoint():
         """Manually trigger database update from S3 (requires admin key)."""
-        if x_admin_key != settings.admin_key:
-            raise HTTPException(status_code=401, detail="Invalid admin key")
-        
         try:
             logger.info("Admin triggered database update")
-            await update_databases()
+            await scheduled_database_update()
             logger.info("Admin database update completed successfully")
             return {"message": "Database update completed successfully"}
         except Exception as e:
-            logger.error(f"Admin database update failed: {e}")
+            logger.error("Admin database update failed: %s", e)
             raise HTTPException(status_code=500, detail=f"Database update failed: {str(e)}")
 
-    @app.post("/admin/cache/clear")
-    async def clear_cache_endpoint(
-        x_admin_key: Optional[str] = Header(None)
-    ):
+    @app.post("/admin/cache/clear", dependencies=[Depends(require_admin_key)])
+    async def clear_cache_endpoint():
         """Clear all cached query results (requires admin key)."""
-        if x_admin_key != settings.admin_key:
-            raise HTTPException(status_code=401, detail="Invalid admin key")
-        
         try:
             cache = get_cache()
             await cache.clear_all()
             logger.info("Admin cleared all cache entries")
             return {"message": "Cache cleared successfully"}
         except Exception as e:
-            logger.error(f"Admin cache clear failed: {e}")
+            logger.error("Admin cache clear failed: %s", e)
             raise HTTPException(status_code=500, detail=f"Cache clear failed: {str(e)}")
 
-    @app.get("/admin/cache/stats")
-    async def get_cache_stats_endpoint(
-        x_admin_key: Optional[str] = Header(None)
-    ):
+    @app.get("/admin/cache/stats", dependencies=[Depends(require_admin_key)])
+    async def get_cache_stats_endpoint():
         """Get cache statistics and configuration (requires admin key)."""
-        if x_admin_key != settings.admin_key:
-            raise HTTPException(status_code=401, detail="Invalid admin key")
-        
         try:
             cache = get_cache()
             cache_type = type(cache).__name__.replace('Cache', '').lower()
@@ -1214,87 +1884,57 @@ if settings.enable_admin:
             
             return stats
         except Exception as e:
-            logger.error(f"Admin cache stats failed: {e}")
+            logger.error("Admin cache stats failed: %s", e)
             raise HTTPException(status_code=500, detail=f"Cache stats failed: {str(e)}")
 
-    @app.get("/admin/databases/status")
-    async def get_database_status_endpoint(
-        x_admin_key: Optional[str] = Header(None)
-    ):
+    @app.get("/admin/databases/status", dependencies=[Depends(require_admin_key)])
+    async def get_database_status_endpoint():
         """Get database loading status (requires admin key)."""
-        if x_admin_key != settings.admin_key:
-            raise HTTPException(status_code=401, detail="Invalid admin key")
-        
         try:
             reader = GeoIPReader()
             status = reader.get_database_status()
             
             total_databases = len(status)
-            loaded_databases = sum(1 for loaded in status.values() if loaded)
+            loaded_databases = sum(status.values())
             
-            return {
+            return ORJSONResponse(content={
                 "databases": status,
                 "summary": {
                     "total": total_databases,
                     "loaded": loaded_databases,
                     "failed": total_databases - loaded_databases
                 }
-            }
+            })
         except Exception as e:
-            logger.error(f"Admin database status check failed: {e}")
+            logger.error("Admin database status check failed: %s", e)
             raise HTTPException(status_code=500, detail=f"Database status check failed: {str(e)}")
 
-    @app.get("/admin/databases/info")
-    async def get_database_info_endpoint(
-        x_admin_key: Optional[str] = Header(None)
-    ):
+    @app.get("/admin/databases/info", dependencies=[Depends(require_admin_key)])
+    async def get_database_info_endpoint():
         """Get database file information (requires admin key)."""
-        if x_admin_key != settings.admin_key:
-            raise HTTPException(status_code=401, detail="Invalid admin key")
-        
         try:
-            database_path = Path(settings.database_path)
+            raw_path = os.path.join(settings.database_path, 'raw')
             info = {}
             
-            # Check MaxMind databases
-            maxmind_path = database_path / 'raw' / 'maxmind'
-            if maxmind_path.exists():
-                info['maxmind'] = {}
-                for db_file in maxmind_path.glob('*.mmdb'):
-                    stat = db_file.stat()
-                    info['maxmind'][db_file.name] = {
-                        "size_bytes": stat.st_size,
-                        "size_mb": round(stat.st_size / (1024 * 1024), 2),
-                        "modified": datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                        "path": str(db_file)
-                    }
-            
-            # Check IP2Location databases  
-            ip2location_path = database_path / 'raw' / 'ip2location'
-            if ip2location_path.exists():
-                info['ip2location'] = {}
-                for db_file in ip2location_path.glob('*.BIN'):
-                    stat = db_file.stat()
-                    info['ip2location'][db_file.name] = {
-                        "size_bytes": stat.st_size,
-                        "size_mb": round(stat.st_size / (1024 * 1024), 2),
-                        "modified": datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                        "path": str(db_file)
-                    }
+            # Check MaxMind and IP2Location databases concurrently in worker
+            # threads so stat() latency on network volumes doesn't block the loop
+            providers = (('maxmind', '.mmdb'), ('ip2location', '.BIN'))
+            scans = await asyncio.gather(*[
+                asyncio.to_thread(scan_database_files, os.path.join(raw_path, provider), suffix)
+                for provider, suffix in providers
+            ])
+            for (provider, _), files in zip(providers, scans):
+                if files is not None:
+                    info[provider] = files
             
-            return info
+            return ORJSONResponse(content=info)
         except Exception as e:
-            logger.error(f"Admin database info check failed: {e}")
+            logger.error("Admin database info check failed: %s", e)
             raise HTTPException(status_code=500, detail=f"Database info check failed: {str(e)}")
 
-    @app.post("/admin/databases/reload")
-    async def reload_databases_endpoint(
-        x_admin_key: Optional[str] = Header(None)
-    ):
+    @app.post("/admin/databases/reload", dependencies=[Depends(require_admin_key)])
+    async def reload_databases_endpoint():
         """Reload databases without updating from S3 (requires admin key)."""
-        if x_admin_key != settings.admin_key:
-            raise HTTPException(status_code=401, detail="Invalid admin key")
-        
         try:
             reader = GeoIPReader()
             reader.reload_databases()
@@ -1302,7 +1942,7 @@ if settings.enable_admin:
             
             # Get updated status
             status = reader.get_database_status()
-            loaded_count = sum(1 for loaded in status.values() if loaded)
+            loaded_count = sum(status.values())
             
             return {
                 "message": f"Databases reloaded successfully ({loaded_count} loaded)",
@@ -1310,17 +1950,12 @@ if settings.enable_admin:
                 "status": status
             }
         except Exception as e:
-            logger.error(f"Admin database reload failed: {e}")
+            logger.error("Admin database reload failed: %s", e)
             raise HTTPException(status_code=500, detail=f"Database reload failed: {str(e)}")
 
-    @app.get("/admin/scheduler/info")
-    async def get_scheduler_info_endpoint(
-        x_admin_key: Optional[str] = Header(None)
-    ):
+    @app.get("/admin/scheduler/info", dependencies=[Depends(require_admin_key)])
+    async def get_scheduler_info_endpoint():
         """Get scheduler information and next run times (requires admin key)."""
-        if x_admin_key != settings.admin_key:
-            raise HTTPException(status_code=401, detail="Invalid admin key")
-        
         try:
             info = {
                 "scheduler_running": scheduler.running,
@@ -1336,20 +1971,16 @@ if settings.enable_admin:
                     "trigger": str(job.trigger)
                 })
             
-            return info
+            return ORJSONResponse(content=info)
         except Exception as e:
-            logger.error(f"Admin scheduler info check failed: {e}")
+            logger.error("Admin scheduler info check failed: %s", e)
             raise HTTPException(status_code=500, detail=f"Scheduler info check failed: {str(e)}")
 
-    @app.post("/admin/scheduler/trigger")
+    @app.post("/admin/scheduler/trigger", dependencies=[Depends(require_admin_key)])
     async def trigger_scheduler_job_endpoint(
-        x_admin_key: Optional[str] = Header(None),
         job_id: str = Query("database_update", description="Job ID to trigger")
     ):
         """Manually trigger a scheduled job (requires admin key)."""
-        if x_admin_key != settings.admin_key:
-            raise HTTPException(status_code=401, detail="Invalid admin key")
-        
         try:
             job = scheduler.get_job(job_id)
             if not job:
@@ -1357,77 +1988,70 @@ if settings.enable_admin:
             
             # Trigger the job
             await job.func()
-            logger.info(f"Admin manually triggered job: {job_id}")
+            logger.info("Admin manually triggered job: %s", job_id)
             
             return {"message": f"Job '{job_id}' triggered successfully"}
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"Admin job trigger failed: {e}")
+            logger.error("Admin job trigger failed: %s", e)
             raise HTTPException(status_code=500, detail=f"Job trigger failed: {str(e)}")
 
-    @app.get("/admin/downloads/status")
-    async def get_download_status_endpoint(
-        x_admin_key: Optional[str] = Header(None)
-    ):
+    @app.get("/admin/downloads/status", dependencies=[Depends(require_admin_key)])
+    async def get_download_status_endpoint():
         """Get detailed download status for all databases (requires admin key)."""
-        if x_admin_key != settings.admin_key:
-            raise HTTPException(status_code=401, detail="Invalid admin key")
-        
         try:
-            from database_updater import DatabaseUpdater
-            updater = DatabaseUpdater()
+            updater = await get_database_updater()
             status = updater.get_download_status()
             
-            # Add summary statistics
+            # Add summary statistics (single pass over the status entries)
+            downloaded = 0
+            total_size_mb = 0
+            temp_files_count = 0
+            for db in status.values():
+                if db['exists']:
+                    downloaded += 1
+                total_size_mb += db['size_mb']
+                temp_files_count += len(db['temp_files'])
+            
             summary = {
                 "total_databases": len(status),
-                "downloaded": sum(1 for db in status.values() if db['exists']),
-                "missing": sum(1 for db in status.values() if not db['exists']),
-                "total_size_mb": sum(db['size_mb'] for db in status.values()),
-                "temp_files_count": sum(len(db['temp_files']) for db in status.values())
+                "downloaded": downloaded,
+                "missing": len(status) - downloaded,
+                "total_size_mb": total_size_mb,
+                "temp_files_count": temp_files_count
             }
             
-            return {
+            return ORJSONResponse(content={
                 "summary": summary,
                 "databases": status,
-                "timestamp": datetime.now().isoformat()
-            }
+                "timestamp": get_cached_timestamp()
+            })
         except Exception as e:
-            logger.error(f"Admin download status check failed: {e}")
+            logger.error("Admin download status check failed: %s", e)
             raise HTTPException(status_code=500, detail=f"Download status check failed: {str(e)}")
 
-    @app.post("/admin/downloads/cleanup")
-    async def cleanup_downloads_endpoint(
-        x_admin_key: Optional[str] = Header(None)
-    ):
+    @app.post("/admin/downloads/cleanup", dependencies=[Depends(require_admin_key)])
+    async def cleanup_downloads_endpoint():
         """Clean up temporary download files (requires admin key)."""
-        if x_admin_key != settings.admin_key:
-            raise HTTPException(status_code=401, detail="Invalid admin key")
-        
         try:
-            from database_updater import DatabaseUpdater
-            updater = DatabaseUpdater()
+            updater = await get_database_updater()
             await updater.cleanup_old_files()
             logger.info("Admin triggered download cleanup")
             
             return {"message": "Download cleanup completed successfully"}
         except Exception as e:
-            logger.error(f"Admin download cleanup failed: {e}")
+            logger.error("Admin download cleanup failed: %s", e)
             raise HTTPException(status_code=500, detail=f"Download cleanup failed: {str(e)}")
 
-    @app.post("/admin/downloads/retry")
+    @app.post("/admin/downloads/retry", dependencies=[Depends(require_admin_key)])
     async def retry_failed_downloads_endpoint(
-        x_admin_key: Optional[str] = Header(None),
         databases: Optional[str] = Query(None, description="Comma-separated list of database names to retry, or 'all' for all missing")
     ):
         """Retry downloading specific databases (requires admin key)."""
-        if x_admin_key != settings.admin_key:
-            raise HTTPException(status_code=401, detail="Invalid admin key")
-        
         try:
-            from database_updater import DatabaseUpdater, AVAILABLE_DATABASES
-            updater = DatabaseUpdater()
+            from database_updater import AVAILABLE_DATABASES
+            updater = await get_database_updater()
             
             # Determine which databases to retry
             if databases == "all" or not databases:
@@ -1445,46 +2069,31 @@ if settings.enable_admin:
             if not databases_to_retry:
                 return {"message": "No databases need to be downloaded", "databases_checked": []}
             
-            logger.info(f"Admin triggered retry for databases: {', '.join(databases_to_retry)}")
+            logger.info("Admin triggered retry for databases: %s", ', '.join(databases_to_retry))
             
             # Create a custom updater method for specific databases
             results = {}
             
-            import aiohttp
-            import asyncio
+            # Per-request timeouts are applied by download_database; the
+            # semaphore matches the connector's per-host limit so only that
+            # many downloads are in flight at once
+            retry_semaphore = asyncio.Semaphore(RETRY_CONCURRENCY)
             
-            connector = aiohttp.TCPConnector(
-                limit=10,
-                limit_per_host=5,
-                ttl_dns_cache=300,
-                use_dns_cache=True,
-            )
-            
-            timeout = aiohttp.ClientTimeout(
-                total=updater.download_timeout,
-                connect=updater.connection_timeout
-            )
+            async def retry_one(db_name: str) -> tuple[str, bool]:
+                async with retry_semaphore:
+                    try:
+                        return db_name, await updater.download_database(
+                            _http_session, db_name, AVAILABLE_DATABASES[db_name]
+                        )
+                    except Exception as e:
+                        logger.error("Exception retrying %s: %s", db_name, e)
+                        return db_name, False
             
-            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-                tasks = {}
-                for db_name in databases_to_retry:
-                    s3_path = AVAILABLE_DATABASES[db_name]
-                    task = updater.download_database(session, db_name, s3_path)
-                    tasks[db_name] = task
-                
-                # Execute downloads concurrently
-                download_results = await asyncio.gather(
-                    *tasks.values(), 
-                    return_exceptions=True
-                )
-                
-                # Map results back to database names
-                for db_name, result in zip(tasks.keys(), download_results):
-                    if isinstance(result, Exception):
-                        logger.error(f"Exception retrying {db_name}: {result}")
-                        results[db_name] = False
-                    else:
-                        results[db_name] = result
+            # Record results as each download finishes (keys keep request order)
+            results = dict.fromkeys(databases_to_retry, False)
+            for finished in asyncio.as_completed([retry_one(db_name) for db_name in databases_to_retry]):
+                db_name, success = await finished
+                results[db_name] = success
             
             successful = [name for name, success in results.items() if success]
             failed = [name for name, success in results.items() if not success]
@@ -1496,24 +2105,22 @@ if settings.enable_admin:
                 "results": results
             }
             
-            logger.info(f"Admin retry completed: {len(successful)}/{len(results)} successful")
+            refresh_local_index()
+            logger.info("Admin retry completed: %s/%s successful", len(successful), len(results))
             return response
             
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"Admin download retry failed: {e}")
+            logger.error("Admin download retry failed: %s", e)
             raise HTTPException(status_code=500, detail=f"Download retry failed: {str(e)}")
 
-    @app.get("/admin/status")
-    async def get_admin_status_endpoint(
-        x_admin_key: Optional[str] = Header(None)
-    ):
+    @app.get("/admin/status", dependencies=[Depends(require_admin_key)])
+    async def get_admin_status_endpoint():
         """Get comprehensive system status for administrators (requires admin key)."""
-        if x_admin_key != settings.admin_key:
-            raise HTTPException(status_code=401, detail="Invalid admin key")
-        
         try:
+            snapshot = get_admin_snapshot()
+            
             # Get basic health info
             reader = GeoIPReader()
             db_status = reader.get_database_status()
@@ -1529,90 +2136,42 @@ if settings.enable_admin:
                 })
             
             # Calculate uptime
-            uptime_seconds = (datetime.now() - metrics["start_time"]).total_seconds()
+            uptime_seconds = metrics.uptime_seconds()
             
-            return {
+            return ORJSONResponse(content={
                 "service": {
                     "status": "healthy",
                     "uptime_seconds": uptime_seconds,
-                    "version": "1.1.3",
-                    "debug_mode": settings.debug
+                    **snapshot["service"]
                 },
                 "databases": {
                     "total": len(db_status),
-                    "loaded": sum(1 for loaded in db_status.values() if loaded),
+                    "loaded": sum(db_status.values()),
                     "status": db_status
                 },
                 "scheduler": {
                     "running": scheduler.running,
                     "jobs": scheduler_jobs
                 },
-                "cache": {
-                    "type": settings.cache_type,
-                    "enabled": settings.cache_type != "none"
-                },
-                "configuration": {
-                    "use_s3_urls": settings.use_s3_urls,
-                    "database_path": settings.database_path,
-                    "workers": settings.workers,
-                    "port": settings.port
-                },
+                "cache": snapshot["cache"],
+                "configuration": snapshot["configuration"],
                 "metrics": {
-                    "total_requests": metrics["total_requests"],
-                    "successful_requests": metrics["successful_requests"],
-                    "failed_requests": metrics["failed_requests"]
+                    "total_requests": metrics.total_requests,
+                    "successful_requests": metrics.successful_requests,
+                    "failed_requests": metrics.failed_requests
                 }
-            }
+            })
         except Exception as e:
-            logger.error(f"Admin status check failed: {e}")
+            logger.error("Admin status check failed: %s", e)
             raise HTTPException(status_code=500, detail=f"Status check failed: {str(e)}")
 
-    @app.get("/admin/config")
-    async def get_admin_config_endpoint(
-        x_admin_key: Optional[str] = Header(None)
-    ):
+    @app.get("/admin/config", dependencies=[Depends(require_admin_key)])
+    async def get_admin_config_endpoint():
         """Get current configuration (sanitized, no secrets) (requires admin key)."""
-        if x_admin_key != settings.admin_key:
-            raise HTTPException(status_code=401, detail="Invalid admin key")
-        
         try:
-            config = {
-                "api": {
-                    "port": settings.port,
-                    "workers": settings.workers,
-                    "debug": settings.debug,
-                    "api_keys_count": len(settings.api_keys)
-                },
-                "database": {
-                    "path": settings.database_path,
-                    "update_schedule": settings.database_update_schedule
-                },
-                "s3": {
-                    "use_s3_urls": settings.use_s3_urls,
-                    "bucket": settings.s3_bucket if settings.use_s3_urls else None,
-                    "region": settings.aws_region if settings.use_s3_urls else None,
-                    "url_expiry_seconds": settings.url_expiry_seconds if settings.use_s3_urls else None
-                },
-                "cache": {
-                    "type": settings.cache_type,
-                    "enabled": settings.cache_type != "none"
-                },
-                "admin": {
-                    "enabled": settings.enable_admin,
-                    "key_configured": bool(settings.admin_key)
-                },
-                "logging": {
-                    "level": settings.log_level
-                }
-            }
-            
-            # Add Redis config if using Redis cache
-            if settings.cache_type == "redis" and hasattr(settings, 'redis_url'):
-                config["cache"]["redis_url"] = "***configured***"
-            
-            return config
+            return ORJSONResponse(content=get_admin_snapshot()["config"])
         except Exception as e:
-            logger.error(f"Admin config check failed: {e}")
+            logger.error("Admin config check failed: %s", e)
             raise HTTPException(status_code=500, detail=f"Config check failed: {str(e)}")
 
 
@@ -1623,6 +2182,8 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=settings.port,
         workers=settings.workers,
+        loop="uvloop",
+        http="httptools",
         log_level="info",
         reload=settings.debug
     )
\ No newline at end of file
@@ -5,22 +5,40 @@ Provides multiple cache backend implementations with automatic
 invalidation on Monday 4am (database update time).
 """
 
-import json
+import asyncio
 import logging
 import sqlite3
+import threading
 import time
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
-import redis
+import orjson
+from redis import asyncio as aioredis
 from config import get_settings
 
 logger = logging.getLogger(__name__)
 
+# Keys removed per UNLINK command when clearing the Redis cache
+REDIS_DELETE_BATCH = 500
+
+
+# Memoized result of get_next_monday_4am_timestamp(), valid until it passes
+_NEXT_MONDAY_4AM = [0]
+
 
 def get_next_monday_4am_timestamp() -> int:
+    """Get the timestamp for next Monday at 4am (recomputed only once it has passed)."""
+    if time.time() < _NEXT_MONDAY_4AM[0]:
+        return _NEXT_MONDAY_4AM[0]
+    _NEXT_MONDAY_4AM[0] = _compute_next_monday_4am_timestamp()
+    return _NEXT_MONDAY_4AM[0]
+
+
+def _compute_next_monday_4am_timestamp() -> int:
     """Calculate the timestamp for next Monday at 4am."""
     now = datetime.now()
     days_until_monday = (7 - now.weekday()) % 7
@@ -47,6 +65,15 @@ class CacheInterface(ABC):
         """Set a value in the cache."""
         pass
     
+    async def mget(self, keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Get multiple values from the cache (None for each miss)."""
+        return [await self.get(key) for key in keys]
+    
+    async def mset(self, items: Dict[str, Dict[str, Any]]) -> None:
+        """Set multiple values in the cache."""
+        for key, value in items.items():
+            await self.set(key, value)
+    
     @abstractmethod
     async def clear_all(self) -> None:
         """Clear all cache entries."""
@@ -59,12 +86,13 @@ class CacheInterface(ABC):
 
 
 class MemoryCache(CacheInterface):
-    """In-memory cache with automatic TTL."""
+    """In-memory LRU cache with automatic TTL, bounded to max_entries."""
     
-    def __init__(self, ttl: Optional[int] = None):
-        self.cache: Dict[str, tuple[Dict[str, Any], int]] = {}
+    def __init__(self, ttl: Optional[int] = None, max_entries: int = 100_000):
+        self.cache: OrderedDict[str, tuple[Dict[str, Any], int]] = OrderedDict()
         self.ttl = ttl
-        logger.info("Initialized memory cache")
+        self.max_entries = max_entries
+        logger.info("Initialized memory cache (max %s entries)", max_entries)
     
     def _get_expiry(self) -> int:
         """Get expiry timestamp."""
@@ -76,9 +104,11 @@ class MemoryCache(CacheInterface):
     
     async def get(self, key: str) -> Optional[Dict[str, Any]]:
         """Get a value from memory cache."""
-        if key in self.cache:
-            value, expiry = self.cache[key]
+        entry = self.cache.get(key)
+        if entry is not None:
+            value, expiry = entry
             if time.time() < expiry:
+                self.cache.move_to_end(key)
                 return value
             else:
                 # Expired, remove it
@@ -86,9 +116,11 @@ class MemoryCache(CacheInterface):
         return None
     
     async def set(self, key: str, value: Dict[str, Any]) -> None:
-        """Set a value in memory cache."""
-        expiry = self._get_expiry()
-        self.cache[key] = (value, expiry)
+        """Set a value in memory cache, evicting the least recently used entry when full."""
+        self.cache[key] = (value, self._get_expiry())
+        self.cache.move_to_end(key)
+        if len(self.cache) > self.max_entries:
+            self.cache.popitem(last=False)
     
     async def clear_all(self) -> None:
         """Clear all cache entries."""
@@ -101,12 +133,12 @@ class MemoryCache(CacheInterface):
 
 
 class RedisCache(CacheInterface):
-    """Redis cache backend."""
+    """Redis cache backend (asyncio client, so Redis round-trips never block the event loop)."""
     
     def __init__(self, redis_url: str, ttl: Optional[int] = None):
-        self.redis_client = redis.from_url(redis_url, decode_responses=True)
+        self.redis_client = aioredis.from_url(redis_url, decode_responses=True)
         self.ttl = ttl
-        logger.info(f"Initialized Redis cache: {redis_url}")
+        logger.info("Initialized Redis cache: %s", redis_url)
     
     def _get_ttl(self) -> int:
         """Get TTL in seconds."""
@@ -119,72 +151,111 @@ class RedisCache(CacheInterface):
     async def get(self, key: str) -> Optional[Dict[str, Any]]:
         """Get a value from Redis cache."""
         try:
-            value = self.redis_client.get(f"geoip:{key}")
+            value = await self.redis_client.get(f"geoip:{key}")
             if value:
-                return json.loads(value)
+                return orjson.loads(value)
         except Exception as e:
-            logger.error(f"Redis get error: {e}")
+            logger.error("Redis get error: %s", e)
         return None
     
     async def set(self, key: str, value: Dict[str, Any]) -> None:
         """Set a value in Redis cache."""
         try:
             ttl = self._get_ttl()
-            self.redis_client.setex(
+            await self.redis_client.setex(
                 f"geoip:{key}",
                 ttl,
-                json.dumps(value)
+                orjson.dumps(value)
             )
         except Exception as e:
-            logger.error(f"Redis set error: {e}")
+            logger.error("Redis set error: %s", e)
+    
+    async def mget(self, keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Get multiple values from Redis in a single MGET round-trip."""
+        if not keys:
+            return []
+        try:
+            values = await self.redis_client.mget([f"geoip:{key}" for key in keys])
+            return [orjson.loads(value) if value else None for value in values]
+        except Exception as e:
+            logger.error("Redis mget error: %s", e)
+        return [None] * len(keys)
+    
+    async def mset(self, items: Dict[str, Dict[str, Any]]) -> None:
+        """Set multiple values in Redis using one pipelined round-trip."""
+        if not items:
+            return
+        try:
+            ttl = self._get_ttl()
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key, value in items.items():
+                pipe.setex(f"geoip:{key}", ttl, orjson.dumps(value))
+            await pipe.execute()
+        except Exception as e:
+            logger.error("Redis mset error: %s", e)
     
     async def clear_all(self) -> None:
-        """Clear all GeoIP cache entries."""
+        """Clear all GeoIP cache entries (UNLINK frees memory off Redis's main thread)."""
         try:
-            pattern = "geoip:*"
-            cursor = 0
-            while True:
-                cursor, keys = self.redis_client.scan(cursor, match=pattern, count=100)
-                if keys:
-                    self.redis_client.delete(*keys)
-                if cursor == 0:
-                    break
+            batch = []
+            async for key in self.redis_client.scan_iter(match="geoip:*", count=1000):
+                batch.append(key)
+                if len(batch) >= REDIS_DELETE_BATCH:
+                    await self.redis_client.unlink(*batch)
+                    batch.clear()
+            if batch:
+                await self.redis_client.unlink(*batch)
             logger.info("Cleared Redis cache")
         except Exception as e:
-            logger.error(f"Redis clear error: {e}")
+            logger.error("Redis clear error: %s", e)
     
     async def close(self) -> None:
         """Close Redis connection."""
         try:
-            self.redis_client.close()
+            await self.redis_client.aclose()
         except:
             pass
 
 
+SQLITE_CACHE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS geoip_cache (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL,
+        expiry INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_expiry ON geoip_cache(expiry);
+"""
+
+
 class SQLiteCache(CacheInterface):
-    """SQLite cache backend for persistence."""
+    """
+    SQLite cache backend for persistence.
+    
+    Holds one long-lived connection in WAL mode (guarded by a lock) for writes
+    instead of opening a connection, and paying journal setup and fsync, on
+    every call. Reads use a read-only connection per worker thread, so they
+    run concurrently with each other and with writes. Queries run in worker
+    threads so disk I/O never blocks the event loop.
+    """
     
     def __init__(self, db_path: str = "/data/cache.db", ttl: Optional[int] = None):
         self.db_path = db_path
         self.ttl = ttl
-        self._init_db()
-        logger.info(f"Initialized SQLite cache: {db_path}")
+        self._lock = threading.Lock()
+        self._conn = self._init_db()
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        logger.info("Initialized SQLite cache: %s", db_path)
     
-    def _init_db(self):
-        """Initialize SQLite database."""
+    def _init_db(self) -> sqlite3.Connection:
+        """Open the SQLite database and create the cache table."""
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS geoip_cache (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL,
-                expiry INTEGER NOT NULL
-            )
-        """)
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_expiry ON geoip_cache(expiry)")
-        conn.commit()
-        conn.close()
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL; skips fsync per commit
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.executescript(SQLITE_CACHE_SCHEMA)
+        return conn
     
     def _get_expiry(self) -> int:
         """Get expiry timestamp."""
@@ -193,79 +264,134 @@ class SQLiteCache(CacheInterface):
         else:
             return get_next_monday_4am_timestamp()
     
+    def _reader(self) -> sqlite3.Connection:
+        """Get this thread's read-only connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            uri = Path(self.db_path).absolute().as_uri() + "?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            self._local.conn = conn
+            with self._lock:
+                self._readers.append(conn)
+        return conn
+    
     async def get(self, key: str) -> Optional[Dict[str, Any]]:
         """Get a value from SQLite cache."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+        return await asyncio.to_thread(self._get_sync, key)
+    
+    def _get_sync(self, key: str) -> Optional[Dict[str, Any]]:
         try:
-            cursor.execute(
+            row = self._reader().execute(
                 "SELECT value, expiry FROM geoip_cache WHERE key = ?",
                 (key,)
-            )
-            row = cursor.fetchone()
+            ).fetchone()
             
             if row:
                 value_json, expiry = row
+                # Expired rows are left for the sweep in close() or overwritten
+                # on the next set, keeping writes off the read path
                 if time.time() < expiry:
-                    return json.loads(value_json)
-                else:
-                    # Expired, remove it
-                    cursor.execute("DELETE FROM geoip_cache WHERE key = ?", (key,))
-                    conn.commit()
+                    return orjson.loads(value_json)
         except Exception as e:
-            logger.error(f"SQLite get error: {e}")
-        finally:
-            conn.close()
+            logger.error("SQLite get error: %s", e)
         
         return None
     
     async def set(self, key: str, value: Dict[str, Any]) -> None:
         """Set a value in SQLite cache."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        await asyncio.to_thread(self._set_sync, key, value)
+    
+    def _set_sync(self, key: str, value: Dict[str, Any]) -> None:
+        try:
+            expiry = self._get_expiry()
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO geoip_cache (key, value, expiry) VALUES (?, ?, ?)",
+                    (key, orjson.dumps(value).decode(), expiry)
+                )
+                self._conn.commit()
+        except Exception as e:
+            logger.error("SQLite set error: %s", e)
+    
+    async def mget(self, keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Get multiple values from SQLite cache with a single query."""
+        if not keys:
+            return []
+        return await asyncio.to_thread(self._mget_sync, keys)
+    
+    def _mget_sync(self, keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+        found: Dict[str, Dict[str, Any]] = {}
         
+        try:
+            placeholders = ",".join("?" * len(keys))
+            rows = self._reader().execute(
+                f"SELECT key, value, expiry FROM geoip_cache WHERE key IN ({placeholders})",
+                keys
+            ).fetchall()
+            now = time.time()
+            for key, value_json, expiry in rows:
+                if now < expiry:
+                    found[key] = orjson.loads(value_json)
+        except Exception as e:
+            logger.error("SQLite mget error: %s", e)
+        
+        return [found.get(key) for key in keys]
+    
+    async def mset(self, items: Dict[str, Dict[str, Any]]) -> None:
+        """Set multiple values in SQLite cache in one transaction."""
+        if not items:
+            return
+        await asyncio.to_thread(self._mset_sync, items)
+    
+    def _mset_sync(self, items: Dict[str, Dict[str, Any]]) -> None:
         try:
             expiry = self._get_expiry()
-            cursor.execute(
-                "INSERT OR REPLACE INTO geoip_cache (key, value, expiry) VALUES (?, ?, ?)",
-                (key, json.dumps(value), expiry)
-            )
-            conn.commit()
+            rows = [(key, orjson.dumps(value).decode(), expiry) for key, value in items.items()]
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO geoip_cache (key, value, expiry) VALUES (?, ?, ?)",
+                    rows
+                )
+                self._conn.commit()
         except Exception as e:
-            logger.error(f"SQLite set error: {e}")
-        finally:
-            conn.close()
+            logger.error("SQLite mset error: %s", e)
     
     async def clear_all(self) -> None:
         """Clear all cache entries."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+        await asyncio.to_thread(self._clear_sync)
+    
+    def _clear_sync(self) -> None:
         try:
-            cursor.execute("DELETE FROM geoip_cache")
-            conn.commit()
+            # An unqualified DELETE on a table without triggers takes SQLite's
+            # truncate optimization, so it doesn't visit rows one by one. It
+            # also leaves the schema alone, which keeps prepared statements
+            # on the read-only connections valid.
+            with self._lock:
+                self._conn.execute("DELETE FROM geoip_cache")
+                self._conn.commit()
             logger.info("Cleared SQLite cache")
         except Exception as e:
-            logger.error(f"SQLite clear error: {e}")
-        finally:
-            conn.close()
+            logger.error("SQLite clear error: %s", e)
     
     async def close(self) -> None:
-        """Cleanup expired entries."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute(
-                "DELETE FROM geoip_cache WHERE expiry < ?",
-                (int(time.time()),)
-            )
-            conn.commit()
-        except:
-            pass
-        finally:
-            conn.close()
+        """Cleanup expired entries and close the connection."""
+        await asyncio.to_thread(self._close_sync)
+    
+    def _close_sync(self) -> None:
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "DELETE FROM geoip_cache WHERE expiry < ?",
+                    (int(time.time()),)
+                )
+                self._conn.commit()
+            except:
+                pass
+            finally:
+                for reader in self._readers:
+                    reader.close()
+                self._readers.clear()
+                self._conn.close()
 
 
 class NoCache(CacheInterface):
@@ -279,6 +405,14 @@ class NoCache(CacheInterface):
         """Does nothing."""
         pass
     
+    async def mget(self, keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Always returns misses."""
+        return [None] * len(keys)
+    
+    async def mset(self, items: Dict[str, Dict[str, Any]]) -> None:
+        """Does nothing."""
+        pass
+    
     async def clear_all(self) -> None:
         """Does nothing."""
         pass
@@ -306,11 +440,11 @@ def get_cache(cache_type: Optional[str] = None) -> CacheInterface:
             return RedisCache(settings.redis_url, settings.cache_ttl)
         else:
             logger.warning("Redis cache requested but REDIS_URL not configured, falling back to memory cache")
-            return MemoryCache(settings.cache_ttl)
+            return MemoryCache(settings.cache_ttl, settings.cache_max_entries)
     elif cache_type == "sqlite":
         return SQLiteCache(ttl=settings.cache_ttl)
     elif cache_type == "none":
         return NoCache()
     else:
         # Default to memory cache
-        return MemoryCache(settings.cache_ttl)
\ No newline at end of file
+        return MemoryCache(settings.cache_ttl, settings.cache_max_entries)
\ No newline at end of file
@@ -3,8 +3,8 @@ Configuration management for GeoIP Docker API.
 """
 
 import os
-from typing import List, Optional
-from functools import lru_cache
+from typing import FrozenSet, List, Optional
+from functools import cached_property, lru_cache
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
@@ -19,13 +19,18 @@ class Settings(BaseSettings):
         description="Comma-separated list of allowed API keys"
     )
     
-    @property
+    @cached_property
     def api_keys(self) -> List[str]:
-        """Parse API keys from comma-separated string."""
+        """Parse API keys from comma-separated string (once per settings instance)."""
         if self.api_keys_str:
             return [k.strip() for k in self.api_keys_str.split(',') if k.strip()]
         return []
     
+    @cached_property
+    def api_keys_set(self) -> FrozenSet[str]:
+        """Distinct API keys as a frozenset for O(1) membership checks."""
+        return frozenset(self.api_keys)
+    
     # Download Configuration
     use_s3_urls: bool = Field(
         default=True,
@@ -99,10 +104,18 @@ class Settings(BaseSettings):
         default=None,
         description="Cache TTL in seconds (default: until next Monday 4am)"
     )
+    cache_max_entries: int = Field(
+        default=100_000,
+        description="Maximum entries held by the in-memory cache (least recently used are evicted)"
+    )
     query_rate_limit: int = Field(
         default=50,
         description="Maximum number of IPs per query"
     )
+    health_cache_ttl: int = Field(
+        default=30,
+        description="Seconds to reuse /health S3 availability results (0 disables)"
+    )
     
     # Session Configuration
     session_secret_key: str = Field(
@@ -119,6 +132,10 @@ class Settings(BaseSettings):
         default="/data/databases",
         description="Path for storing downloaded databases"
     )
+    download_accel_redirect: Optional[str] = Field(
+        default=None,
+        description="Internal nginx location mapped to database_path; /download hands files to nginx via X-Accel-Redirect"
+    )
     
     class Config:
         env_file = ".env"
@@ -129,23 +146,28 @@ class Settings(BaseSettings):
         extra = "ignore"
 
 
-@lru_cache()
-def get_settings(force_reload: bool = False) -> Settings:
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
     """
     Get cached settings instance.
     
-    Args:
-        force_reload: Force reload settings from environment
-    
     Returns:
         Settings instance
     """
-    if force_reload:
-        get_settings.cache_clear()
-    
     return Settings()
 
 
+def reload_settings() -> Settings:
+    """
+    Reload settings from the environment, replacing the cached instance.
+    
+    Returns:
+        Fresh Settings instance
+    """
+    get_settings.cache_clear()
+    return get_settings()
+
+
 def validate_settings(settings: Settings) -> bool:
     """
     Validate settings configuration.
@@ -211,7 +233,9 @@ LOG_LEVEL=INFO                       # Log level
 CACHE_TYPE=memory                    # Options: memory, redis, sqlite, none
 REDIS_URL=redis://localhost:6379    # Redis URL (if using Redis cache)
 CACHE_TTL=604800                     # Cache TTL in seconds (optional)
+CACHE_MAX_ENTRIES=100000             # Max entries for the memory cache
 QUERY_RATE_LIMIT=50                  # Max IPs per query
+HEALTH_CACHE_TTL=30                  # Seconds to cache /health S3 checks
 
 # Session Configuration
 SESSION_SECRET_KEY=your-secret-key  # Secret for session cookies
@@ -219,4 +243,5 @@ SESSION_SECRET_KEY=your-secret-key  # Secret for session cookies
 # Database Update Configuration
 DATABASE_UPDATE_SCHEDULE=0 4 * * 1  # Cron schedule (Monday 4am)
 DATABASE_PATH=/data/databases       # Path for storing databases
+DOWNLOAD_ACCEL_REDIRECT=/internal-databases  # Optional: serve /download via nginx sendfile
 """
\ No newline at end of file
@@ -8,15 +8,19 @@ Runs on a schedule (Monday 4am) to keep databases up-to-date.
 import asyncio
 import aiohttp
 import logging
+import os
 import subprocess
 import time
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Dict, Iterator, Optional, Tuple
 
 import boto3
 from botocore.exceptions import ClientError
 
+from cache import get_cache
 from config import get_settings
+from geoip_reader import GeoIPReader
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +40,38 @@ AVAILABLE_DATABASES = {
 }
 
 
+@lru_cache(maxsize=None)
+def get_s3_client(access_key_id: Optional[str], secret_access_key: Optional[str], region: str):
+    """
+    Get the S3 client for a set of credentials, creating it on first use.
+    
+    boto3 clients are slow to build (service model parsing) but thread-safe,
+    so one client per credential set is shared by every updater run.
+    """
+    if access_key_id and secret_access_key:
+        return boto3.client(
+            's3',
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+            region_name=region
+        )
+    # Use default AWS credentials (IAM role, etc.)
+    return boto3.client('s3', region_name=region)
+
+
+def iter_temp_files(directory: str) -> Iterator[str]:
+    """Yield paths of *.tmp and *.tmp.* files under directory, recursively."""
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from iter_temp_files(entry.path)
+        elif entry.name.endswith('.tmp') or '.tmp.' in entry.name:
+            yield entry.path
+
+
 class DatabaseUpdater:
     """Handles downloading and updating GeoIP databases from S3."""
     
@@ -54,16 +90,11 @@ class DatabaseUpdater:
         
     def _init_s3_client(self):
         """Initialize S3 client."""
-        if self.settings.aws_access_key_id and self.settings.aws_secret_access_key:
-            return boto3.client(
-                's3',
-                aws_access_key_id=self.settings.aws_access_key_id,
-                aws_secret_access_key=self.settings.aws_secret_access_key,
-                region_name=self.settings.aws_region
-            )
-        else:
-            # Use default AWS credentials (IAM role, etc.)
-            return boto3.client('s3', region_name=self.settings.aws_region)
+        return get_s3_client(
+            self.settings.aws_access_key_id,
+            self.settings.aws_secret_access_key,
+            self.settings.aws_region
+        )
     
     def generate_s3_presigned_url(self, database_name: str) -> Optional[str]:
         """
@@ -137,7 +168,7 @@ class DatabaseUpdater:
                            (f" ({total_size:,} bytes)" if total_size else " (size unknown)"))
                 
                 downloaded = 0
-                chunk_size = 8192  # 8KB chunks
+                chunk_size = 1024 * 1024  # 1MB chunks
                 
                 with open(temp_path, 'wb') as f:
                     async for chunk in response.content.iter_chunked(chunk_size):
@@ -153,6 +184,12 @@ class DatabaseUpdater:
                                 progress_info += f" ({percent:.1f}%)"
                             logger.info(f"{database_name}: {progress_info}")
                             last_progress_time = current_time
+                    
+                    f.flush()
+                    # Durable before the atomic rename, so a crash can never
+                    # leave a torn database behind the final name. The pages
+                    # stay cached: the reader reloads this file right away.
+                    await asyncio.to_thread(os.fsync, f.fileno())
                 
                 # Validate file size
                 if downloaded < self.min_file_size:
@@ -200,8 +237,8 @@ class DatabaseUpdater:
         Returns:
             True if successful, False otherwise
         """
-        # Generate S3 pre-signed URL
-        url = self.generate_s3_presigned_url(database_name)
+        # Generate S3 pre-signed URL (boto3 is blocking, keep it off the event loop)
+        url = await asyncio.to_thread(self.generate_s3_presigned_url, database_name)
         if not url:
             logger.error(f"❌ Failed to generate URL for {database_name}")
             return False
@@ -236,9 +273,11 @@ class DatabaseUpdater:
         start_time = time.time()
         
         # Create aiohttp session with connection limits
+        # Every database lives in the same bucket, so the per-host limit must
+        # cover all of them or the gather below is partly serialized
         connector = aiohttp.TCPConnector(
             limit=10,  # Total connection limit
-            limit_per_host=5,  # Per-host connection limit
+            limit_per_host=len(AVAILABLE_DATABASES),  # Per-host connection limit
             ttl_dns_cache=300,  # DNS cache TTL
             use_dns_cache=True,
         )
@@ -311,8 +350,9 @@ class DatabaseUpdater:
             return True
         
         try:
-            # Run validation script
-            result = subprocess.run(
+            # Run validation script in a worker thread so the API keeps serving
+            result = await asyncio.to_thread(
+                subprocess.run,
                 ['python', str(validation_script), str(self.database_path / 'raw')],
                 capture_output=True,
                 text=True,
@@ -338,17 +378,15 @@ class DatabaseUpdater:
         """Remove any temporary or old database files."""
         try:
             # Remove .tmp and .tmp.* files (from retry attempts)
-            temp_patterns = ["*.tmp", "*.tmp.*"]
             cleaned_count = 0
             
-            for pattern in temp_patterns:
-                for tmp_file in self.database_path.rglob(pattern):
-                    try:
-                        tmp_file.unlink()
-                        logger.debug(f"🗑️  Removed temp file: {tmp_file}")
-                        cleaned_count += 1
-                    except Exception as e:
-                        logger.warning(f"Failed to remove temp file {tmp_file}: {e}")
+            for tmp_file in iter_temp_files(str(self.database_path)):
+                try:
+                    os.unlink(tmp_file)
+                    logger.debug(f"🗑️  Removed temp file: {tmp_file}")
+                    cleaned_count += 1
+                except Exception as e:
+                    logger.warning(f"Failed to remove temp file {tmp_file}: {e}")
             
             if cleaned_count > 0:
                 logger.info(f"🧹 Cleaned up {cleaned_count} temporary files")
@@ -400,7 +438,9 @@ async def update_databases():
     Main function to update databases from S3.
     Called by the scheduler in app.py.
     """
-    updater = DatabaseUpdater()
+    # Creating the boto3 client loads service models and may resolve
+    # credentials over the network, so do it in a worker thread
+    updater = await asyncio.to_thread(DatabaseUpdater)
     
     try:
         # Update all databases
@@ -411,7 +451,6 @@ async def update_databases():
         
         # Clear cache after successful update
         try:
-            from cache import get_cache
             cache = get_cache()
             await cache.clear_all()
             logger.info("Cache cleared after database update")
@@ -420,7 +459,6 @@ async def update_databases():
         
         # Reload databases in reader if it exists
         try:
-            from geoip_reader import GeoIPReader
             # Only reload if the reader singleton has been initialized
             if hasattr(GeoIPReader, '_instance') and GeoIPReader._instance is not None:
                 reader = GeoIPReader()
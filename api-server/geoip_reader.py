@@ -5,16 +5,123 @@ Provides unified interface for reading MaxMind and IP2Location databases
 and querying IP addresses for geographic and network information.
 """
 
+import bisect
+import copy
+import ipaddress
 import os
 import logging
+import socket
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import geoip2.database
 from IP2Location import IP2Location
 from IP2Proxy import IP2Proxy
 
 logger = logging.getLogger(__name__)
 
+# Fields returned by query() when full_data is False
+ESSENTIAL_FIELDS = frozenset({
+    'country', 'country_code', 'city', 'region', 'postal_code',
+    'isp', 'organization', 'timezone', 'is_proxy', 'is_vpn',
+    'usage_type', 'latitude', 'longitude'
+})
+
+# IP2Proxy proxy_type codes as bit flags
+PROXY_TYPE_BITS = {
+    'VPN': 1,
+    'TOR': 2,
+    'DCH': 4,   # Data Center/Hosting
+    'PUB': 8,   # Public Proxy
+    'WEB': 16,  # Web Proxy
+    'SES': 32,  # Search Engine Spider
+}
+
+# Upper bound on memoized (ip, full_data) lookups per process
+LOOKUP_CACHE_SIZE = 65536
+
+# Private, loopback, link-local, documentation and multicast ranges that no
+# GeoIP database has real data for
+RESERVED_NETWORKS = (
+    '0.0.0.0/8', '10.0.0.0/8', '100.64.0.0/10', '127.0.0.0/8',
+    '169.254.0.0/16', '172.16.0.0/12', '192.0.0.0/24', '192.0.2.0/24',
+    '192.168.0.0/16', '198.18.0.0/15', '198.51.100.0/24', '203.0.113.0/24',
+    '224.0.0.0/4', '240.0.0.0/4',
+    '::/127', '2001:db8::/32', 'fc00::/7', 'fe80::/10', 'ff00::/8',
+)
+
+
+def _build_reserved_ranges() -> Dict[int, Tuple[List[int], List[int]]]:
+    """Compile RESERVED_NETWORKS into sorted (starts, ends) integers per IP version."""
+    ranges: Dict[int, List[Tuple[int, int]]] = {4: [], 6: []}
+    for cidr in RESERVED_NETWORKS:
+        network = ipaddress.ip_network(cidr)
+        ranges[network.version].append(
+            (int(network.network_address), int(network.broadcast_address))
+        )
+    return {
+        version: ([start for start, _ in sorted(spans)], [end for _, end in sorted(spans)])
+        for version, spans in ranges.items()
+    }
+
+
+_RESERVED_RANGES = _build_reserved_ranges()
+
+
+def prefetch_file(path: Path) -> None:
+    """
+    Ask the kernel to read a database file into the page cache.
+    
+    Readers mmap the files, so without this the first lookups after a
+    (re)load page-fault their way through the trie from disk.
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def is_reserved_address(ip: str) -> bool:
+    """Check whether ip falls in one of RESERVED_NETWORKS."""
+    try:
+        value, version = int.from_bytes(socket.inet_pton(socket.AF_INET, ip), 'big'), 4
+    except OSError:
+        try:
+            value, version = int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), 'big'), 6
+        except OSError:
+            return False
+    starts, ends = _RESERVED_RANGES[version]
+    idx = bisect.bisect_right(starts, value) - 1
+    return idx >= 0 and value <= ends[idx]
+
+
+def _open_ip2proxy(path: str) -> IP2Proxy:
+    """Open an IP2Proxy database, raising if the library reports an error."""
+    db = IP2Proxy()
+    # IP2Proxy.open() returns None on success, not 0
+    result = db.open(path)
+    if result is not None and result != 0:
+        raise RuntimeError(f"error code {result}")
+    return db
+
+
+def _address_sort_key(ip: str) -> Tuple[int, bytes]:
+    """Sort key placing IPv4 before IPv6, each in numeric order."""
+    for family, rank in ((socket.AF_INET, 4), (socket.AF_INET6, 6)):
+        try:
+            return rank, socket.inet_pton(family, ip)
+        except OSError:
+            pass
+    return 0, ip.encode()
+
 
 class GeoIPReader:
     """Singleton class for reading GeoIP databases and querying IP addresses."""
@@ -33,23 +140,75 @@ class GeoIPReader:
             return
             
         self.databases = {}
+        self._fingerprints: Dict[str, Tuple[int, int]] = {}
         self.database_path = Path(os.environ.get('DATABASE_PATH', '/data/databases'))
+        # Lookups are pure for a given set of open databases, so repeat IPs
+        # are served from memory until the next reload_databases()
+        self._cached_lookup = lru_cache(maxsize=LOOKUP_CACHE_SIZE)(self._lookup)
         self._load_databases()
         self._initialized = True
     
-    def _load_databases(self):
-        """Load all available GeoIP databases."""
-        # MaxMind databases
-        maxmind_path = self.database_path / 'raw' / 'maxmind'
-        if maxmind_path.exists():
-            self._load_maxmind_databases(maxmind_path)
-        
-        # IP2Location databases
-        ip2location_path = self.database_path / 'raw' / 'ip2location'
-        if ip2location_path.exists():
-            self._load_ip2location_databases(ip2location_path)
+    def _load_databases(self) -> bool:
+        """
+        Load all available GeoIP databases.
+        
+        Returns:
+            True if any database was opened, replaced or dropped
+        """
+        changed = self._load_maxmind_databases(self.database_path / 'raw' / 'maxmind')
+        changed |= self._load_ip2location_databases(self.database_path / 'raw' / 'ip2location')
+        return changed
+    
+    def _open_database(self, key: str, path: Path, opener: Callable[[str], Any], label: str) -> bool:
+        """
+        Open one database, keeping the current reader if the file is unchanged.
+        
+        Files are fingerprinted by (size, mtime_ns); updates replace them via
+        rename, so an equal fingerprint means the open reader (and its warm
+        mmap pages) can be kept.
+        
+        Returns:
+            True if the database was opened, replaced or dropped
+        """
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return self._close_database(key)
+        
+        fingerprint = (st.st_size, st.st_mtime_ns)
+        if key in self.databases and self._fingerprints.get(key) == fingerprint:
+            return False
+        
+        # Open the replacement before touching the current reader. If the
+        # new file can't be opened, keep serving the old one and try again
+        # on the next reload.
+        try:
+            db = opener(str(path))
+        except Exception as e:
+            logger.error("Failed to load %s: %s", label, e)
+            return False
+        
+        # The old reader is not closed explicitly: lookups on worker threads
+        # may still hold it, and refcounting closes it once the last one
+        # finishes, so no lookup ever reads from a closed reader
+        self.databases[key] = db
+        self._fingerprints[key] = fingerprint
+        
+        prefetch_file(path)
+        logger.info("Loaded %s", label)
+        return True
+    
+    def _close_database(self, key: str) -> bool:
+        """
+        Forget one database. Returns True if it was open.
+        
+        As with replacement, the reader is closed by refcounting once any
+        in-flight lookups have dropped it.
+        """
+        self._fingerprints.pop(key, None)
+        return self.databases.pop(key, None) is not None
     
-    def _load_maxmind_databases(self, path: Path):
+    def _load_maxmind_databases(self, path: Path) -> bool:
         """Load MaxMind MMDB databases."""
         mmdb_files = {
             'city': 'GeoIP2-City.mmdb',
@@ -58,51 +217,45 @@ class GeoIPReader:
             'connection_type': 'GeoIP2-Connection-Type.mmdb'
         }
         
+        changed = False
         for db_type, filename in mmdb_files.items():
-            db_path = path / filename
-            if db_path.exists():
-                try:
-                    self.databases[f'maxmind_{db_type}'] = geoip2.database.Reader(str(db_path))
-                    logger.info(f"Loaded MaxMind {db_type} database: {filename}")
-                except Exception as e:
-                    logger.error(f"Failed to load MaxMind {db_type} database: {e}")
+            changed |= self._open_database(
+                f'maxmind_{db_type}', path / filename, geoip2.database.Reader,
+                f'MaxMind {db_type} database ({filename})'
+            )
+        return changed
     
-    def _load_ip2location_databases(self, path: Path):
-        """Load IP2Location BIN databases."""
+    def _load_ip2location_databases(self, path: Path) -> bool:
+        """
+        Load IP2Location BIN databases.
+        
+        BIN files use the library's default FILE_IO mode: SHARED_MEMORY maps
+        them writable, which fails on the read-only database mounts.
+        """
         # IP2Location DB23 IPv4
-        db23_path = path / 'IP-COUNTRY-REGION-CITY-LATITUDE-LONGITUDE-ISP-DOMAIN-MOBILE-USAGETYPE.BIN'
-        if db23_path.exists():
-            try:
-                self.databases['ip2location_v4'] = IP2Location()
-                self.databases['ip2location_v4'].open(str(db23_path))
-                logger.info("Loaded IP2Location IPv4 database")
-            except Exception as e:
-                logger.error(f"Failed to load IP2Location IPv4 database: {e}")
+        changed = self._open_database(
+            'ip2location_v4',
+            path / 'IP-COUNTRY-REGION-CITY-LATITUDE-LONGITUDE-ISP-DOMAIN-MOBILE-USAGETYPE.BIN',
+            IP2Location,
+            'IP2Location IPv4 database'
+        )
         
         # IP2Location DB23 IPv6
-        db23_ipv6_path = path / 'IPV6-COUNTRY-REGION-CITY-LATITUDE-LONGITUDE-ISP-DOMAIN-MOBILE-USAGETYPE.BIN'
-        if db23_ipv6_path.exists():
-            try:
-                self.databases['ip2location_v6'] = IP2Location()
-                self.databases['ip2location_v6'].open(str(db23_ipv6_path))
-                logger.info("Loaded IP2Location IPv6 database")
-            except Exception as e:
-                logger.error(f"Failed to load IP2Location IPv6 database: {e}")
+        changed |= self._open_database(
+            'ip2location_v6',
+            path / 'IPV6-COUNTRY-REGION-CITY-LATITUDE-LONGITUDE-ISP-DOMAIN-MOBILE-USAGETYPE.BIN',
+            IP2Location,
+            'IP2Location IPv6 database'
+        )
         
         # IP2Proxy database
-        proxy_path = path / 'IP2PROXY-IP-PROXYTYPE-COUNTRY.BIN'
-        if proxy_path.exists():
-            try:
-                self.databases['ip2proxy'] = IP2Proxy()
-                # IP2Proxy.open() returns None on success, not 0
-                result = self.databases['ip2proxy'].open(str(proxy_path))
-                if result is None or result == 0:
-                    logger.info("Loaded IP2Proxy database")
-                else:
-                    logger.error(f"Failed to open IP2Proxy database: error code {result}")
-                    del self.databases['ip2proxy']
-            except Exception as e:
-                logger.error(f"Failed to load IP2Proxy database: {e}")
+        changed |= self._open_database(
+            'ip2proxy',
+            path / 'IP2PROXY-IP-PROXYTYPE-COUNTRY.BIN',
+            _open_ip2proxy,
+            'IP2Proxy database'
+        )
+        return changed
     
     async def query(self, ip: str, full_data: bool = False) -> Optional[Dict[str, Any]]:
         """
@@ -115,18 +268,65 @@ class GeoIPReader:
         Returns:
             Dictionary containing GeoIP data or None if not found
         """
+        return self.query_sync(ip, full_data)
+    
+    def query_sync(self, ip: str, full_data: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Synchronous version of query(), safe to run in worker threads.
+        
+        Args:
+            ip: IP address to query
+            full_data: Whether to return all available data or just essential fields
+            
+        Returns:
+            Dictionary containing GeoIP data or None if not found
+        """
+        result = self._cached_lookup(ip, full_data)
+        if result is None:
+            return None
+        # Hand out copies so callers can never mutate a memoized result
+        return copy.deepcopy(result) if full_data else dict(result)
+    
+    def query_batch(self, ips: List[str], full_data: bool = False) -> List[Optional[Dict[str, Any]]]:
+        """
+        Look up many IP addresses in one call.
+        
+        Each distinct address is looked up once, in numeric order, so
+        consecutive lookups walk neighbouring parts of each database.
+        
+        Args:
+            ips: IP addresses to query
+            full_data: Whether to return all available data or just essential fields
+            
+        Returns:
+            One result (or None if not found) per entry in ips, in the same order
+        """
+        found = {
+            ip: self.query_sync(ip, full_data)
+            for ip in sorted(set(ips), key=_address_sort_key)
+        }
+        return [found[ip] for ip in ips]
+    
+    def _lookup(self, ip: str, full_data: bool) -> Optional[Dict[str, Any]]:
+        """Uncached lookup behind query_sync()."""
+        # Reserved ranges never have data; skip the database calls entirely
+        if is_reserved_address(ip):
+            return None
+        
+        if not full_data:
+            return self._query_essential(ip)
+        
         result = {}
-        # Tracks which database provided each field (populated/used only in full_data mode)
+        # Tracks which database provided each field
         database_sources = {}
         
         # Query MaxMind databases
         maxmind_data = self._query_maxmind(ip)
         if maxmind_data:
             result.update(maxmind_data)
-            if full_data:
-                # Track which fields came from MaxMind
-                for key in maxmind_data:
-                    database_sources[key] = 'MaxMind'
+            # Track which fields came from MaxMind
+            for key in maxmind_data:
+                database_sources[key] = 'MaxMind'
         
         # Query IP2Location databases (gap-fill: MaxMind wins overlaps;
         # IP2Location only fills fields MaxMind left empty)
@@ -135,102 +335,127 @@ class GeoIPReader:
             for key, value in ip2location_data.items():
                 if key not in result or result[key] in (None, '', '-'):
                     result[key] = value
-                    if full_data:
-                        database_sources[key] = 'IP2Location'
+                    database_sources[key] = 'IP2Location'
         
         # Query IP2Proxy database
         proxy_data = self._query_ip2proxy(ip)
         if proxy_data:
-            if full_data:
-                for key in proxy_data:
-                    database_sources[key] = 'IP2Proxy'
+            for key in proxy_data:
+                database_sources[key] = 'IP2Proxy'
             result.update(proxy_data)
         
         if not result:
             return None
         
-        # Add database sources and per-database breakdowns in full_data mode
-        if full_data:
-            result['_database_sources'] = database_sources
-            # Also add which databases were queried
-            result['_databases_available'] = self.get_database_status()
-            # Preserve each database's OWN values so the per-database view never
-            # shows another database's data (no merge contamination).
-            result['_by_database'] = {
-                'maxmind':     {k: v for k, v in maxmind_data.items()     if v not in (None, '', '-')},
-                'ip2location': {k: v for k, v in ip2location_data.items() if v not in (None, '', '-')},
-                'ip2proxy':    {k: v for k, v in proxy_data.items()       if v not in (None, '', '-')},
-            }
-        
-        # Filter to essential fields if not full_data
-        if not full_data:
-            essential_fields = {
-                'country', 'country_code', 'city', 'region', 'postal_code',
-                'isp', 'organization', 'timezone', 'is_proxy', 'is_vpn',
-                'usage_type', 'latitude', 'longitude'
-            }
-            result = {k: v for k, v in result.items() if k in essential_fields}
+        # Add database sources and per-database breakdowns
+        result['_database_sources'] = database_sources
+        # Also add which databases were queried
+        result['_databases_available'] = self.get_database_status()
+        # Preserve each database's OWN values so the per-database view never
+        # shows another database's data (no merge contamination).
+        result['_by_database'] = {
+            'maxmind':     {k: v for k, v in maxmind_data.items()     if v not in (None, '', '-')},
+            'ip2location': {k: v for k, v in ip2location_data.items() if v not in (None, '', '-')},
+            'ip2proxy':    {k: v for k, v in proxy_data.items()       if v not in (None, '', '-')},
+        }
         
         return result
     
-    def _query_maxmind(self, ip: str) -> Dict[str, Any]:
-        """Query MaxMind databases for IP information."""
+    def _query_essential(self, ip: str) -> Optional[Dict[str, Any]]:
+        """
+        Hot path for query(full_data=False).
+        
+        Writes only ESSENTIAL_FIELDS straight into the result, with the same
+        precedence as the full path, and skips the connection type lookup
+        whose only field is never returned here.
+        """
+        result = {}
+        
+        for key, value in self._query_maxmind(ip, essential_only=True).items():
+            if key in ESSENTIAL_FIELDS:
+                result[key] = value
+        
+        for key, value in self._query_ip2location(ip, essential_only=True).items():
+            if key in ESSENTIAL_FIELDS and result.get(key) in (None, '', '-'):
+                result[key] = value
+        
+        for key, value in self._query_ip2proxy(ip).items():
+            if key in ESSENTIAL_FIELDS:
+                result[key] = value
+        
+        return result or None
+    
+    def _query_maxmind(self, ip: str, essential_only: bool = False) -> Dict[str, Any]:
+        """
+        Query MaxMind databases for IP information.
+        
+        With essential_only, non-essential fields are not read and databases
+        that contribute no essential field (connection type) are not queried.
+        """
         data = {}
         
         # City database (most comprehensive)
         if 'maxmind_city' in self.databases:
             try:
                 response = self.databases['maxmind_city'].city(ip)
-                data.update({
-                    'country': response.country.name,
-                    'country_code': response.country.iso_code,
+                country = response.country
+                location = response.location
+                subdivisions = response.subdivisions
+                data = {
+                    'country': country.name,
+                    'country_code': country.iso_code,
                     'city': response.city.name,
-                    'region': response.subdivisions.most_specific.name if response.subdivisions else None,
+                    'region': subdivisions.most_specific.name if subdivisions else None,
                     'postal_code': response.postal.code,
-                    'latitude': response.location.latitude,
-                    'longitude': response.location.longitude,
-                    'timezone': response.location.time_zone,
-                    'accuracy_radius': response.location.accuracy_radius,
-                })
+                    'latitude': location.latitude,
+                    'longitude': location.longitude,
+                    'timezone': location.time_zone,
+                }
+                if not essential_only:
+                    data['accuracy_radius'] = location.accuracy_radius
             except Exception as e:
-                logger.debug(f"MaxMind city query failed for {ip}: {e}")
+                logger.debug("MaxMind city query failed for %s: %s", ip, e)
         
         # Country database (fallback if city not available)
         elif 'maxmind_country' in self.databases:
             try:
-                response = self.databases['maxmind_country'].country(ip)
-                data.update({
-                    'country': response.country.name,
-                    'country_code': response.country.iso_code,
-                })
+                country = self.databases['maxmind_country'].country(ip).country
+                data = {
+                    'country': country.name,
+                    'country_code': country.iso_code,
+                }
             except Exception as e:
-                logger.debug(f"MaxMind country query failed for {ip}: {e}")
+                logger.debug("MaxMind country query failed for %s: %s", ip, e)
         
         # ISP database
         if 'maxmind_isp' in self.databases:
             try:
                 response = self.databases['maxmind_isp'].isp(ip)
-                data.update({
-                    'isp': response.isp,
-                    'organization': response.organization,
-                    'autonomous_system_number': response.autonomous_system_number,
-                    'autonomous_system_organization': response.autonomous_system_organization,
-                })
+                data['isp'] = response.isp
+                data['organization'] = response.organization
+                if not essential_only:
+                    data['autonomous_system_number'] = response.autonomous_system_number
+                    data['autonomous_system_organization'] = response.autonomous_system_organization
             except Exception as e:
-                logger.debug(f"MaxMind ISP query failed for {ip}: {e}")
+                logger.debug("MaxMind ISP query failed for %s: %s", ip, e)
         
         # Connection Type database
-        if 'maxmind_connection_type' in self.databases:
+        if not essential_only and 'maxmind_connection_type' in self.databases:
             try:
                 response = self.databases['maxmind_connection_type'].connection_type(ip)
                 data['connection_type'] = response.connection_type
             except Exception as e:
-                logger.debug(f"MaxMind connection type query failed for {ip}: {e}")
+                logger.debug("MaxMind connection type query failed for %s: %s", ip, e)
         
         return data
     
-    def _query_ip2location(self, ip: str) -> Dict[str, Any]:
-        """Query IP2Location databases for IP information."""
+    def _query_ip2location(self, ip: str, essential_only: bool = False) -> Dict[str, Any]:
+        """
+        Query IP2Location databases for IP information.
+        
+        With essential_only, non-essential fields (domain, mobile brand)
+        are not read.
+        """
         data = {}
         
         # Determine which database to use based on IP version
@@ -244,7 +469,7 @@ class GeoIPReader:
         try:
             rec = db.get_all(ip)
             if rec:
-                data.update({
+                data = {
                     'country': rec.country_long,
                     'country_code': rec.country_short,
                     'region': rec.region,
@@ -252,14 +477,15 @@ class GeoIPReader:
                     'latitude': rec.latitude,
                     'longitude': rec.longitude,
                     'isp': rec.isp,
-                    'domain': rec.domain,
                     'usage_type': rec.usage_type,  # Fixed field name
-                    'mobile_brand': rec.mobile_brand,  # Fixed field name
-                })
+                }
+                if not essential_only:
+                    data['domain'] = rec.domain
+                    data['mobile_brand'] = rec.mobile_brand  # Fixed field name
                 # Remove None values and '-' placeholders
                 data = {k: v for k, v in data.items() if v is not None and v != '-'}
         except Exception as e:
-            logger.debug(f"IP2Location query failed for {ip}: {e}")
+            logger.debug("IP2Location query failed for %s: %s", ip, e)
         
         return data
     
@@ -278,51 +504,42 @@ class GeoIPReader:
                 data['is_proxy'] = is_proxy
                 
                 if is_proxy:
-                    proxy_types = {
-                        'VPN': False,
-                        'TOR': False,
-                        'DCH': False,  # Data Center/Hosting
-                        'PUB': False,  # Public Proxy
-                        'WEB': False,  # Web Proxy
-                        'SES': False,  # Search Engine Spider
-                    }
-                    
                     proxy_type = result.get('proxy_type', '-')
+                    mask = 0
                     if proxy_type != '-':
                         for ptype in proxy_type.split(','):
-                            ptype = ptype.strip()
-                            if ptype in proxy_types:
-                                proxy_types[ptype] = True
+                            mask |= PROXY_TYPE_BITS.get(ptype.strip(), 0)
                     
-                    data['is_vpn'] = proxy_types['VPN']
-                    data['is_tor'] = proxy_types['TOR']
-                    data['is_datacenter'] = proxy_types['DCH']
+                    data['is_vpn'] = bool(mask & PROXY_TYPE_BITS['VPN'])
+                    data['is_tor'] = bool(mask & PROXY_TYPE_BITS['TOR'])
+                    data['is_datacenter'] = bool(mask & PROXY_TYPE_BITS['DCH'])
                     data['proxy_type'] = proxy_type
                 else:
                     data['is_vpn'] = False
                     data['is_tor'] = False
                     data['is_datacenter'] = False
         except Exception as e:
-            logger.debug(f"IP2Proxy query failed for {ip}: {e}")
+            logger.debug("IP2Proxy query failed for %s: %s", ip, e)
         
         return data
     
     def reload_databases(self):
-        """Reload all databases (useful after updates)."""
-        logger.info("Reloading GeoIP databases...")
+        """
+        Reload databases whose files changed (useful after updates).
         
-        # Close existing database connections
-        for db in self.databases.values():
-            if hasattr(db, 'close'):
-                try:
-                    db.close()
-                except:
-                    pass
+        Unchanged files keep their open reader. Changed ones are swapped in
+        and the old reader is released once in-flight lookups finish; the
+        lookup cache is dropped afterwards (only if at least one database
+        was replaced), so results computed against a half-reloaded set are
+        not kept.
+        """
+        logger.info("Reloading GeoIP databases...")
         
-        # Clear and reload
-        self.databases.clear()
-        self._load_databases()
-        logger.info("GeoIP databases reloaded")
+        if self._load_databases():
+            self._cached_lookup.cache_clear()
+            logger.info("GeoIP databases reloaded")
+        else:
+            logger.info("GeoIP databases unchanged, nothing to reload")
     
     def get_database_status(self) -> Dict[str, bool]:
         """Get the status of loaded databases."""
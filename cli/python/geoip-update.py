@@ -31,21 +31,21 @@ Environment Variables:
 """
 
 import asyncio
-import aiohttp
 import click
 import json
 import logging
+import mmap
 import os
 import sys
 import tempfile
 import time
-import shutil
 import signal
 import hashlib
 import platform
 from datetime import datetime
+from collections import ChainMap
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
 from dataclasses import dataclass, field
 from concurrent.futures import ThreadPoolExecutor
 
@@ -70,14 +70,16 @@ except ImportError:
 
 __all__ = ['Config', 'LockFile', 'GeoIPUpdater', 'main']
 
-try:
-    import yaml
-    HAS_YAML = True
-except ImportError:
-    HAS_YAML = False
+# aiohttp and yaml are imported where they are used: together they are most of
+# the startup time, and --help, --version, --validate-only and early exits
+# (lock held, missing API key) never need them
+if TYPE_CHECKING:
+    import aiohttp
+
+IS_WINDOWS = platform.system() == 'Windows'
 
 # Platform-specific imports for file locking
-if platform.system() == 'Windows':
+if IS_WINDOWS:
     import msvcrt
     fcntl = None
 else:
@@ -91,6 +93,23 @@ DEFAULT_RETRIES = 3
 DEFAULT_TIMEOUT = 1800  # overall ceiling; per-read stall timeout is the real guard
 DEFAULT_MAX_CONCURRENT = 2  # bandwidth-bound: fewer streams finish large files sooner
 LOCK_FILE = Path(tempfile.gettempdir()) / "geoip-update.lock"
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MiB per read/write on the download path
+SHA256_HEADER = 'x-amz-meta-sha256'  # object metadata carrying the expected digest
+MMDB_METADATA_MARKER = b'\xab\xcd\xefMaxMind.com'
+MMDB_METADATA_MAX_SIZE = 128 * 1024  # the metadata section is within the last 128 KiB
+
+# Config fields that may be set from a config file
+CONFIG_FILE_KEYS = (
+    'api_key', 'api_endpoint', 'target_dir', 'databases', 'max_retries',
+    'timeout', 'max_concurrent', 'verify_ssl', 'user_agent',
+)
+
+# Environment variables and the Config fields they set
+ENV_SETTINGS = {
+    'GEOIP_API_KEY': 'api_key',
+    'GEOIP_API_ENDPOINT': 'api_endpoint',
+    'GEOIP_TARGET_DIR': 'target_dir',
+}
 
 # Available databases for validation
 AVAILABLE_DATABASES = {
@@ -125,6 +144,38 @@ class Config:
     user_agent: str = "GeoIP-Update-Python/1.0"
 
 
+def write_all(fd: int, data: bytes):
+    """Write all of data to a raw file descriptor."""
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def flush_to_disk(fd: int):
+    """Make a downloaded file durable and drop it from the page cache.
+    
+    The databases are written once and not read again until a consumer
+    reloads them, so keeping the fresh pages cached would only evict
+    other, hotter data.
+    """
+    os.fsync(fd)
+    if hasattr(os, 'posix_fadvise'):
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def has_mmdb_metadata(file_path: Path) -> bool:
+    """Check for the MaxMind metadata marker near the end of an MMDB file.
+    
+    The file is memory-mapped and searched backwards in place, so only the
+    pages holding the tail are touched and nothing is copied into Python.
+    """
+    with open(file_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = max(0, len(mm) - MMDB_METADATA_MAX_SIZE)
+            return mm.rfind(MMDB_METADATA_MARKER, start) != -1
+
+
 class LockFile:
     """Cross-platform lock file implementation."""
     
@@ -137,6 +188,11 @@ class LockFile:
     def acquire(self) -> bool:
         """Acquire the lock.
         
+        The OS lock on the open file is the whole mechanism: it is released
+        automatically when the holder exits or dies, so there is no stale
+        lock to detect and no PID liveness check. The PID written into the
+        file is informational only.
+        
         Returns:
             bool: True if lock acquired successfully, False otherwise.
         """
@@ -144,35 +200,26 @@ class LockFile:
             return True
         
         try:
-            # Try to read existing lock
-            if self.path.exists():
-                try:
-                    with open(self.path, 'r') as f:
-                        pid = int(f.read().strip())
-                    
-                    # Check if process is still running
-                    if self._is_process_running(pid):
-                        logger.error(f"Another instance is already running (PID: {pid})")
-                        return False
-                    else:
-                        logger.warning(f"Removing stale lock file (PID: {pid})")
-                        self.path.unlink()
-                except (ValueError, IOError):
-                    pass
-            
-            # Create new lock
-            self.fd = open(self.path, 'w')
+            # Open without truncating so a running holder's PID stays readable
+            self.fd = open(self.path, 'a+')
+            self.fd.seek(0)
             
-            if platform.system() == 'Windows':
-                # Windows file locking
-                if msvcrt:
+            try:
+                if IS_WINDOWS:
+                    # Windows file locking
                     msvcrt.locking(self.fd.fileno(), msvcrt.LK_NBLCK, 1)
-            else:
-                # Unix file locking
-                if fcntl:
+                else:
+                    # Unix file locking
                     fcntl.flock(self.fd.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except (IOError, OSError):
+                holder = self.fd.read().strip() or 'unknown'
+                logger.error(f"Another instance is already running (PID: {holder})")
+                self.fd.close()
+                self.fd = None
+                return False
             
             # Write PID
+            self.fd.truncate(0)
             self.fd.write(str(os.getpid()))
             self.fd.flush()
             self.locked = True
@@ -183,25 +230,28 @@ class LockFile:
             logger.error(f"Failed to acquire lock: {e}")
             if self.fd:
                 self.fd.close()
+                self.fd = None
             return False
     
     def release(self):
-        """Release the lock."""
+        """Release the lock.
+        
+        The lock file itself is left in place: unlinking it would let a
+        process that opened the old file and a process that creates a new
+        one both believe they hold the lock.
+        """
         if self.no_lock or not self.locked:
             return
         
         try:
             if self.fd:
-                if platform.system() == 'Windows':
-                    if msvcrt:
-                        msvcrt.locking(self.fd.fileno(), msvcrt.LK_UNLCK, 1)
+                if IS_WINDOWS:
+                    self.fd.seek(0)
+                    msvcrt.locking(self.fd.fileno(), msvcrt.LK_UNLCK, 1)
                 else:
-                    if fcntl:
-                        fcntl.flock(self.fd.fileno(), fcntl.LOCK_UN)
+                    fcntl.flock(self.fd.fileno(), fcntl.LOCK_UN)
                 self.fd.close()
-            
-            if self.path.exists():
-                self.path.unlink()
+                self.fd = None
             
             logger.debug("Released lock")
         except Exception as e:
@@ -209,30 +259,6 @@ class LockFile:
         finally:
             self.locked = False
     
-    def _is_process_running(self, pid: int) -> bool:
-        """Check if a process with given PID is running.
-        
-        Args:
-            pid: Process ID to check.
-            
-        Returns:
-            bool: True if process is running, False otherwise.
-        """
-        if platform.system() == 'Windows':
-            import subprocess
-            try:
-                result = subprocess.run(['tasklist', '/FI', f'PID eq {pid}'], 
-                                      capture_output=True, text=True, check=False)
-                return str(pid) in result.stdout
-            except:
-                return False
-        else:
-            try:
-                os.kill(pid, 0)
-                return True
-            except OSError:
-                return False
-    
     def __enter__(self):
         if not self.acquire():
             sys.exit(1)
@@ -247,8 +273,10 @@ class GeoIPUpdater:
     
     def __init__(self, config: Config):
         self.config = config
-        self.session: Optional[aiohttp.ClientSession] = None
-        self.temp_dir: Optional[Path] = None
+        self.session: Optional['aiohttp.ClientSession'] = None
+        # Partial downloads live next to their targets so the final move is a
+        # same-filesystem rename; the pid keeps parallel --no-lock runs apart
+        self.temp_suffix = f".part.{os.getpid()}"
         self.downloaded_files: Set[str] = set()
         self.failed_files: Set[str] = set()
         
@@ -272,6 +300,8 @@ class GeoIPUpdater:
     
     async def __aenter__(self):
         """Async context manager entry."""
+        import aiohttp
+        
         # total is a generous ceiling; sock_read is the stall guard (abort only
         # if no data arrives for 120s), so large databases finish on slow links.
         timeout = aiohttp.ClientTimeout(
@@ -279,9 +309,14 @@ class GeoIPUpdater:
             sock_connect=30,
             sock_read=120,
         )
+        # Keep-alive lets the download GETs and resumed Range requests reuse
+        # TLS connections; only the per-host limit gates concurrency, so the
+        # auth POST to the API never waits behind downloads from the CDN
         connector = aiohttp.TCPConnector(
-            limit=self.config.max_concurrent,
-            force_close=True,
+            limit=0,
+            limit_per_host=self.config.max_concurrent,
+            ttl_dns_cache=300,
+            enable_cleanup_closed=True,
             ssl=self.config.verify_ssl
         )
         self.session = aiohttp.ClientSession(
@@ -290,10 +325,6 @@ class GeoIPUpdater:
             headers={'User-Agent': self.config.user_agent}
         )
         
-        # Create temporary directory
-        self.temp_dir = Path(tempfile.mkdtemp(prefix="geoip-update-"))
-        logger.debug(f"Created temporary directory: {self.temp_dir}")
-        
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
@@ -301,13 +332,13 @@ class GeoIPUpdater:
         if self.session:
             await self.session.close()
         
-        # Cleanup temporary directory
-        if self.temp_dir and self.temp_dir.exists():
+        # Cleanup partial downloads left by failed databases
+        for temp_file in self.config.target_dir.glob(f"*{self.temp_suffix}"):
             try:
-                shutil.rmtree(self.temp_dir)
-                logger.debug("Removed temporary directory")
+                temp_file.unlink()
+                logger.debug(f"Removed partial download: {temp_file.name}")
             except Exception as e:
-                logger.warning(f"Failed to remove temporary directory: {e}")
+                logger.warning(f"Failed to remove partial download {temp_file.name}: {e}")
     
     async def authenticate(self) -> Dict[str, str]:
         """Authenticate with the API and get download URLs.
@@ -318,6 +349,8 @@ class GeoIPUpdater:
         Raises:
             Exception: If authentication fails after all retries.
         """
+        import aiohttp
+        
         logger.info("Authenticating with API endpoint")
         
         headers = {
@@ -362,92 +395,95 @@ class GeoIPUpdater:
         
         raise Exception(f"Failed to authenticate after {self.config.max_retries} attempts")
     
-    def validate_database_file(self, file_path: Path, db_name: str) -> bool:
-        """Validate downloaded database file."""
-        if not file_path.exists():
-            return False
+    def validate_database_file(self, file_path: Path, db_name: str,
+                               size: Optional[int] = None, tail: Optional[bytes] = None) -> bool:
+        """Validate downloaded database file.
+        
+        size and tail (the last MMDB_METADATA_MAX_SIZE bytes) may be passed in
+        by a caller that already saw the data, to skip re-reading the file.
+        """
+        if size is None:
+            if not file_path.exists():
+                return False
+            size = file_path.stat().st_size
         
         # Check file size
-        size = file_path.stat().st_size
         if size == 0:
             logger.error(f"Database file {db_name} is empty")
             return False
         
         # Basic validation based on file type
         try:
-            with open(file_path, 'rb') as f:
-                header = f.read(16)
-                
-                if db_name.endswith('.mmdb'):
-                    # MaxMind database should start with specific bytes
-                    if len(header) < 16:
-                        logger.error(f"Invalid MMDB file {db_name}: too small")
-                        return False
-                    # MMDB files have metadata at the end with marker \xab\xcd\xef followed by MaxMind.com
-                    # Read the last 100KB to find the metadata section
-                    read_size = min(size, 100000)
-                    f.seek(max(0, size - read_size))
-                    content = f.read(read_size)
-                    if b'\xab\xcd\xefMaxMind.com' not in content:
-                        logger.warning(f"MMDB file {db_name} may be invalid: missing MaxMind metadata marker")
+            if db_name.endswith('.mmdb'):
+                # MaxMind database should start with specific bytes
+                if size < 16:
+                    logger.error(f"Invalid MMDB file {db_name}: too small")
+                    return False
+                # MMDB files have metadata at the end with marker \xab\xcd\xef followed by MaxMind.com
+                if tail is not None:
+                    found = tail.rfind(MMDB_METADATA_MARKER) != -1
+                else:
+                    found = has_mmdb_metadata(file_path)
+                if not found:
+                    logger.warning(f"MMDB file {db_name} may be invalid: missing MaxMind metadata marker")
+            
+            elif db_name.endswith('.BIN'):
+                # IP2Location binary files have specific structure
+                if size < 4:
+                    logger.error(f"Invalid BIN file {db_name}: too small")
+                    return False
                 
-                elif db_name.endswith('.BIN'):
-                    # IP2Location binary files have specific structure
-                    if len(header) < 4:
-                        logger.error(f"Invalid BIN file {db_name}: too small")
-                        return False
-                    
-                    # Try to validate with IP2Location/IP2Proxy libraries if available
-                    if 'PROXY' in db_name.upper() or 'PX' in db_name.upper():
-                        if HAS_IP2PROXY:
-                            try:
-                                db = IP2Proxy(str(file_path))
-                                # Try a simple query to validate
-                                result = db.get_all('8.8.8.8')
-                                logger.debug(f"IP2Proxy validation successful for {db_name}")
-                            except Exception as e:
-                                logger.warning(f"IP2Proxy validation failed for {db_name}: {e}")
-                                return False
-                    elif HAS_IP2LOCATION:
+                # Try to validate with IP2Location/IP2Proxy libraries if available
+                if 'PROXY' in db_name.upper() or 'PX' in db_name.upper():
+                    if HAS_IP2PROXY:
                         try:
-                            db = IP2Location(str(file_path))
+                            db = IP2Proxy(str(file_path))
                             # Try a simple query to validate
                             result = db.get_all('8.8.8.8')
-                            logger.debug(f"IP2Location validation successful for {db_name}")
+                            logger.debug(f"IP2Proxy validation successful for {db_name}")
                         except Exception as e:
-                            logger.warning(f"IP2Location validation failed for {db_name}: {e}")
+                            logger.warning(f"IP2Proxy validation failed for {db_name}: {e}")
                             return False
-                
-                # Additional validation: Try to open with geoip2 if it's an MMDB file
-                if db_name.endswith('.mmdb') and HAS_GEOIP2:
+                elif HAS_IP2LOCATION:
                     try:
-                        reader = geoip2.database.Reader(str(file_path))
-                        # Try a simple lookup to ensure it works
-                        try:
-                            if 'City' in db_name:
-                                reader.city('8.8.8.8')
-                            elif 'Country' in db_name:
-                                reader.country('8.8.8.8')
-                            elif 'ISP' in db_name:
-                                reader.isp('8.8.8.8')
-                            else:
-                                # Generic test
-                                reader.country('8.8.8.8')
-                        except:
-                            pass  # Some lookups may fail for certain IPs, but file is valid
-                        reader.close()
-                        logger.debug(f"GeoIP2 validation successful for {db_name}")
+                        db = IP2Location(str(file_path))
+                        # Try a simple query to validate
+                        result = db.get_all('8.8.8.8')
+                        logger.debug(f"IP2Location validation successful for {db_name}")
                     except Exception as e:
-                        logger.warning(f"GeoIP2 validation failed for {db_name}: {e}")
+                        logger.warning(f"IP2Location validation failed for {db_name}: {e}")
                         return False
             
+            # Additional validation: Try to open with geoip2 if it's an MMDB file
+            if db_name.endswith('.mmdb') and HAS_GEOIP2:
+                try:
+                    reader = geoip2.database.Reader(str(file_path))
+                    # Try a simple lookup to ensure it works
+                    try:
+                        if 'City' in db_name:
+                            reader.city('8.8.8.8')
+                        elif 'Country' in db_name:
+                            reader.country('8.8.8.8')
+                        elif 'ISP' in db_name:
+                            reader.isp('8.8.8.8')
+                        else:
+                            # Generic test
+                            reader.country('8.8.8.8')
+                    except:
+                        pass  # Some lookups may fail for certain IPs, but file is valid
+                    reader.close()
+                    logger.debug(f"GeoIP2 validation successful for {db_name}")
+                except Exception as e:
+                    logger.warning(f"GeoIP2 validation failed for {db_name}: {e}")
+                    return False
+            
             return True
             
         except Exception as e:
             logger.error(f"Error validating {db_name}: {e}")
             return False
     
-    async def download_database(self, name: str, url: str) -> bool:
+    async def download_database(self, name: str, url: str, semaphore: asyncio.Semaphore) -> bool:
         """Download a single database file.
 
         Resumes on interruption/stall (HTTP Range) instead of restarting from
@@ -455,9 +491,24 @@ class GeoIPUpdater:
         transfer keeps making progress; gives up only after a few consecutive
         no-progress attempts. The session's sock_read timeout aborts a stalled
         read so this loop can resume it.
+
+        The ETag of the last installed copy is kept in a .<name>.etag file
+        next to it and sent as If-None-Match, so an unchanged database is
+        answered with 304 and not transferred again.
+
+        A slot from semaphore is held only while a request is in flight, so
+        a database waiting to retry doesn't keep other downloads queued.
         """
-        temp_file = self.temp_dir / name
         target_file = self.config.target_dir / name
+        temp_file = self.config.target_dir / f"{name}{self.temp_suffix}"
+        etag_file = self.config.target_dir / f".{name}.etag"
+
+        known_etag = None
+        if target_file.exists():
+            try:
+                known_etag = etag_file.read_text().strip() or None
+            except OSError:
+                pass
 
         logger.info(f"Downloading: {name}")
         if temp_file.exists():
@@ -468,6 +519,13 @@ class GeoIPUpdater:
         no_progress = 0
         attempt = 0
         success = False
+        # SHA-256 of every byte written to temp_file, kept across resumes;
+        # checked against the object's published digest when there is one
+        digest = hashlib.sha256()
+        expected_sha256 = None
+        etag = None
+        # Last MMDB_METADATA_MAX_SIZE bytes written, for validation without a re-read
+        tail = bytearray()
 
         while True:
             attempt += 1
@@ -480,10 +538,20 @@ class GeoIPUpdater:
             if offset > 0:
                 headers['Range'] = f'bytes={offset}-'
                 logger.info(f"Resuming {name} from {offset:,} bytes (attempt {attempt})")
+            elif known_etag:
+                headers['If-None-Match'] = known_etag
 
+            complete = False
+            size = offset
             try:
-                async with self.session.get(url, headers=headers) as response:
+                async with semaphore, self.session.get(url, headers=headers) as response:
                     status = response.status
+                    expected_sha256 = response.headers.get(SHA256_HEADER, expected_sha256)
+                    etag = response.headers.get('ETag', etag)
+                    if status == 304:
+                        logger.info(f"{name} is already up to date")
+                        self.downloaded_files.add(name)
+                        return True
                     if status in (401, 403):
                         logger.error(f"{name}: access denied (HTTP {status}) - the download URL "
                                      f"may have expired; re-run to refresh URLs")
@@ -491,21 +559,34 @@ class GeoIPUpdater:
                         return False
                     if status == 416:
                         # Range not satisfiable -> we already have the whole file
-                        success = True
-                        break
-                    if status == 206:
-                        mode = 'ab'  # resuming, append
+                        complete = True
+                    elif status == 206:
+                        mode = os.O_APPEND  # resuming, append
                     elif status == 200:
-                        mode = 'wb'  # full body (server ignored any Range)
+                        mode = os.O_TRUNC  # full body (server ignored any Range)
+                        digest = hashlib.sha256()
+                        tail = bytearray()
+                        size = 0
                     else:
                         raise Exception(f"HTTP {status}")
 
-                    with open(temp_file, mode) as f:
-                        async for chunk in response.content.iter_chunked(65536):
-                            f.write(chunk)
-                # Stream read to EOF without error -> file is complete
-                success = True
-                break
+                    if status != 416:
+                        # Unbuffered fd: each chunk is already large, so a Python
+                        # file buffer would only add a copy
+                        fd = os.open(temp_file, os.O_WRONLY | os.O_CREAT | mode | getattr(os, 'O_BINARY', 0), 0o644)
+                        try:
+                            async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                                write_all(fd, chunk)
+                                digest.update(chunk)
+                                size += len(chunk)
+                                tail += chunk[-MMDB_METADATA_MAX_SIZE:]
+                                del tail[:-MMDB_METADATA_MAX_SIZE]
+                            # Make the completed file durable before it is moved into place
+                            await asyncio.get_running_loop().run_in_executor(None, flush_to_disk, fd)
+                        finally:
+                            os.close(fd)
+                        # Stream read to EOF without error -> file is complete
+                        complete = True
 
             except Exception as e:
                 cur = temp_file.stat().st_size if temp_file.exists() else 0
@@ -519,19 +600,44 @@ class GeoIPUpdater:
                         break
                     await asyncio.sleep(5)
 
+            if not complete:
+                continue
+
+            if expected_sha256 and digest.hexdigest() != expected_sha256.strip().lower():
+                # Corrupted in transit: start over rather than install it
+                no_progress += 1
+                logger.warning(f"{name}: SHA-256 mismatch (attempt {no_progress}/{max_no_progress}) - restarting download")
+                temp_file.unlink()
+                digest = hashlib.sha256()
+                tail = bytearray()
+                if no_progress >= max_no_progress:
+                    break
+                continue
+
+            success = True
+            break
+
         if not success:
             logger.error(f"Failed to download {name}")
             self.failed_files.add(name)
             return False
 
         # Validate and move into place
-        if not self.validate_database_file(temp_file, name):
+        if not self.validate_database_file(temp_file, name, size, tail):
             logger.error(f"Downloaded file failed validation: {name}")
             self.failed_files.add(name)
             return False
 
-        file_size = temp_file.stat().st_size
-        shutil.move(str(temp_file), str(target_file))
+        file_size = size
+        # Same directory, so this is a single atomic rename with no copy
+        os.replace(temp_file, target_file)
+        try:
+            if etag:
+                etag_file.write_text(etag)
+            elif etag_file.exists():
+                etag_file.unlink()
+        except OSError as e:
+            logger.debug(f"Could not record ETag for {name}: {e}")
         logger.info(f"Successfully downloaded: {name} ({file_size:,} bytes)")
         self.downloaded_files.add(name)
         return True
@@ -556,19 +662,40 @@ class GeoIPUpdater:
             return
         
         # Download databases concurrently
-        tasks = []
         semaphore = asyncio.Semaphore(self.config.max_concurrent)
         
-        async def download_with_semaphore(name: str, url: str):
-            async with semaphore:
-                return await self.download_database(name, url)
+        names = {}
         
-        for name, url in urls.items():
-            task = asyncio.create_task(download_with_semaphore(name, url))
-            tasks.append(task)
+        def reap(done):
+            for task in done:
+                name = names.pop(task)
+                if not task.cancelled() and task.exception() is not None:
+                    logger.error(f"Error downloading {name}: {task.exception()}")
+                    self.failed_files.add(name)
         
-        # Wait for all downloads
-        await asyncio.gather(*tasks, return_exceptions=True)
+        # Keep a bounded pool of tasks so finished downloads are released
+        # as soon as they complete rather than held until the end
+        pending = set()
+        try:
+            for name, url in urls.items():
+                if len(pending) >= self.config.max_concurrent * 2:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    reap(done)
+                task = asyncio.create_task(self.download_database(name, url, semaphore))
+                names[task] = name
+                pending.add(task)
+            
+            # Wait for the remaining downloads
+            if pending:
+                done, pending = await asyncio.wait(pending)
+                reap(done)
+        except asyncio.CancelledError:
+            # Stop in-flight downloads too; asyncio.wait doesn't cancel them
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.wait(pending)
+            raise
         
         # Summary
         total = len(urls)
@@ -582,6 +709,23 @@ class GeoIPUpdater:
             raise Exception(f"Failed to download {failed} databases")
 
 
+def run_async(coro):
+    """Run a coroutine on uvloop when it is installed, else on the stdlib loop.
+    
+    uvloop.run() (uvloop >= 0.18) replaces the deprecated uvloop.install();
+    uvloop isn't available on Windows.
+    """
+    if not IS_WINDOWS:
+        try:
+            import uvloop
+        except ImportError:
+            pass
+        else:
+            if hasattr(uvloop, 'run'):
+                return uvloop.run(coro)
+    return asyncio.run(coro)
+
+
 def setup_logging(config: Config):
     """Setup logging configuration."""
     handlers = []
@@ -611,14 +755,30 @@ def setup_logging(config: Config):
 
 
 def load_config_file(config_path: Path) -> dict:
-    """Load configuration from YAML file."""
-    if not HAS_YAML:
+    """Load configuration from a YAML file, or JSON if it ends in .json."""
+    if config_path.suffix.lower() == '.json':
+        try:
+            with open(config_path, 'rb') as f:
+                return json.load(f) or {}
+        except ValueError as e:
+            logger.error(f"Invalid JSON in config file: {e}")
+            sys.exit(1)
+        except Exception as e:
+            logger.error(f"Failed to load config file: {e}")
+            sys.exit(1)
+    
+    try:
+        import yaml
+    except ImportError:
         logger.error("PyYAML is required for config file support. Install with: pip install pyyaml")
         sys.exit(1)
     
+    # Use the libyaml-backed loader when PyYAML was built with it
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    
     try:
-        with open(config_path, 'r') as f:
-            return yaml.safe_load(f) or {}
+        with open(config_path, 'rb') as f:
+            return yaml.load(f, Loader=loader) or {}
     except yaml.YAMLError as e:
         logger.error(f"Invalid YAML in config file: {e}")
         sys.exit(1)
@@ -629,6 +789,8 @@ def load_config_file(config_path: Path) -> dict:
 
 async def fetch_databases_info(config: Config) -> Optional[dict]:
     """Fetch database information from the /databases endpoint."""
+    import aiohttp
+    
     databases_endpoint = config.api_endpoint.replace('/auth', '/databases')
     
     try:
@@ -781,18 +943,15 @@ def validate_database_files_command(config: Config):
         
         # Validate MMDB format
         try:
-            # Check for MaxMind.com marker in last 100KB
-            with open(file_path, 'rb') as f:
-                f.seek(max(0, size - 100000))
-                content = f.read()
-                if b'\xab\xcd\xefMaxMind.com' not in content:
-                    logger.error(f"  ❌ {basename} - Invalid MMDB format (missing MaxMind metadata)")
-                    invalid_files += 1
-                    has_errors = True
-                else:
-                    size_mb = size // (1024 * 1024)
-                    logger.info(f"  ✅ {basename} ({size_mb}MB) - Valid MMDB format")
-                    valid_files += 1
+            # Check for MaxMind.com marker in the metadata section
+            if not has_mmdb_metadata(file_path):
+                logger.error(f"  ❌ {basename} - Invalid MMDB format (missing MaxMind metadata)")
+                invalid_files += 1
+                has_errors = True
+            else:
+                size_mb = size // (1024 * 1024)
+                logger.info(f"  ✅ {basename} ({size_mb}MB) - Valid MMDB format")
+                valid_files += 1
         except Exception as e:
             logger.error(f"  ❌ {basename} - Error validating: {e}")
             invalid_files += 1
@@ -857,6 +1016,8 @@ def validate_database_files_command(config: Config):
 
 async def check_database_names_command(config: Config):
     """Validate database names with API without downloading."""
+    import aiohttp
+    
     if not config.databases or config.databases == ['all']:
         print("✓ Database selection 'all' is valid")
         return
@@ -901,7 +1062,7 @@ async def check_database_names_command(config: Config):
 @click.option('-e', '--endpoint', help='API endpoint URL')
 @click.option('-d', '--directory', type=click.Path(), help='Target directory (default: ./geoip)')
 @click.option('-b', '--databases', multiple=True, help='Database names or "all" (default: all)')
-@click.option('-c', '--config', type=click.Path(exists=True), help='Configuration file (YAML)')
+@click.option('-c', '--config', type=click.Path(exists=True), help='Configuration file (YAML, or JSON with a .json suffix)')
 @click.option('-l', '--log-file', type=click.Path(), help='Log file path')
 @click.option('-r', '--retries', type=int, help='Max retries (default: 3)')
 @click.option('-t', '--timeout', type=int, help='Overall download ceiling in seconds (default: 1800; aborts early only on stall)')
@@ -920,70 +1081,56 @@ def main(api_key, endpoint, directory, databases, config, log_file, retries,
          list_databases, show_examples, check_names, validate_only):
     """Download GeoIP databases from authenticated API."""
     
-    # Create default config
-    config_obj = Config()
-    
-    # Load from config file if specified
+    # Resolve every setting in one pass, highest precedence first:
+    # command line > environment > config file > Config defaults
+    file_settings = {}
     if config:
-        config_path = Path(config)
-        data = load_config_file(config_path)
-        
-        config_obj.api_key = data.get('api_key', config_obj.api_key)
-        config_obj.api_endpoint = data.get('api_endpoint', config_obj.api_endpoint)
-        config_obj.target_dir = Path(data.get('target_dir', config_obj.target_dir))
-        config_obj.databases = data.get('databases', config_obj.databases)
-        config_obj.max_retries = data.get('max_retries', config_obj.max_retries)
-        config_obj.timeout = data.get('timeout', config_obj.timeout)
-        config_obj.max_concurrent = data.get('max_concurrent', config_obj.max_concurrent)
-        config_obj.verify_ssl = data.get('verify_ssl', config_obj.verify_ssl)
-        config_obj.user_agent = data.get('user_agent', config_obj.user_agent)
+        data = load_config_file(Path(config))
+        file_settings = {key: data[key] for key in CONFIG_FILE_KEYS if key in data}
     
-    # Override with environment variables
-    config_obj.api_key = os.environ.get('GEOIP_API_KEY', config_obj.api_key)
-    config_obj.api_endpoint = os.environ.get('GEOIP_API_ENDPOINT', config_obj.api_endpoint)
-    if 'GEOIP_TARGET_DIR' in os.environ:
-        config_obj.target_dir = Path(os.environ['GEOIP_TARGET_DIR'])
+    env_settings = {
+        key: os.environ[var] for var, key in ENV_SETTINGS.items() if var in os.environ
+    }
     
-    # Override with command line arguments
-    if api_key:
-        config_obj.api_key = api_key
-    if endpoint:
-        config_obj.api_endpoint = endpoint
-    if directory:
-        config_obj.target_dir = Path(directory)
-    if databases:
-        config_obj.databases = list(databases)
-    if log_file:
-        config_obj.log_file = Path(log_file)
-    if retries is not None:
-        config_obj.max_retries = retries
-    if timeout is not None:
-        config_obj.timeout = timeout
-    if concurrent is not None:
-        config_obj.max_concurrent = concurrent
+    cli_settings = {
+        'api_key': api_key or None,
+        'api_endpoint': endpoint or None,
+        'target_dir': directory or None,
+        'databases': list(databases) or None,
+        'log_file': log_file or None,
+        'max_retries': retries,
+        'timeout': timeout,
+        'max_concurrent': concurrent,
+        'quiet': quiet or None,
+        'verbose': verbose or None,
+        'no_lock': no_lock or None,
+        'verify_ssl': False if no_ssl_verify else None,
+    }
+    cli_settings = {key: value for key, value in cli_settings.items() if value is not None}
     
-    config_obj.quiet = quiet
-    config_obj.verbose = verbose
-    config_obj.no_lock = no_lock
-    config_obj.verify_ssl = not no_ssl_verify
+    settings = dict(ChainMap(cli_settings, env_settings, file_settings))
+    for key in ('target_dir', 'log_file'):
+        if settings.get(key) is not None:
+            settings[key] = Path(settings[key])
+    config_obj = Config(**settings)
     
     # Setup logging
     setup_logging(config_obj)
     
     # Handle special commands that don't require full configuration
     if list_databases:
-        asyncio.run(list_databases_command(config_obj))
+        run_async(list_databases_command(config_obj))
         return
     
     if show_examples:
-        asyncio.run(show_examples_command(config_obj))
+        run_async(show_examples_command(config_obj))
         return
     
     if check_names:
         if not config_obj.api_key:
             logger.error("API key required for name checking. Use --api-key or set GEOIP_API_KEY")
             sys.exit(1)
-        asyncio.run(check_database_names_command(config_obj))
+        run_async(check_database_names_command(config_obj))
         return
     
     if validate_only:
@@ -1004,26 +1151,40 @@ def main(api_key, endpoint, directory, databases, config, log_file, retries,
     else:
         logger.info(f"Using custom API endpoint: {config_obj.api_endpoint}")
     
-    # Signal handler for cleanup
-    def signal_handler(signum, frame):
-        logger.error("Interrupted by signal")
-        sys.exit(1)
-    
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
-    
     # Run update
     exit_code = 0
     
     try:
         with LockFile(LOCK_FILE, config_obj.no_lock):
-            # Run async update
-            async def run():
+            # Run async update. SIGINT/SIGTERM are delivered to the event loop
+            # so the update is cancelled cooperatively and the session, partial
+            # downloads and lock are all cleaned up on the way out.
+            async def run() -> bool:
+                loop = asyncio.get_running_loop()
+                stop = asyncio.Event()
+                for sig in (signal.SIGINT, signal.SIGTERM):
+                    try:
+                        loop.add_signal_handler(sig, stop.set)
+                    except NotImplementedError:
+                        pass  # Windows: Ctrl-C still raises KeyboardInterrupt
+                
                 async with GeoIPUpdater(config_obj) as updater:
-                    await updater.update_databases()
+                    update = asyncio.ensure_future(updater.update_databases())
+                    stopped = asyncio.ensure_future(stop.wait())
+                    await asyncio.wait({update, stopped}, return_when=asyncio.FIRST_COMPLETED)
+                    stopped.cancel()
+                    if not update.done():
+                        update.cancel()
+                        await asyncio.wait({update})
+                        return False
+                    update.result()
+                    return True
             
-            asyncio.run(run())
-            logger.info("GeoIP update completed successfully")
+            if run_async(run()):
+                logger.info("GeoIP update completed successfully")
+            else:
+                logger.error("Interrupted by signal")
+                exit_code = 1
             
     except KeyboardInterrupt:
         logger.error("Interrupted by user")
@@ -5,16 +5,33 @@ Uses environment variables for API key storage - perfect for internal use.
 
 import json
 import os
+import time
 import boto3
-from typing import Dict, List, Optional, Any
+from typing import Dict, Optional, Any, Sequence, Tuple
 
 # Environment variables
 S3_BUCKET = os.environ.get('S3_BUCKET', 'your-geoip-bucket')
 ALLOWED_API_KEYS = os.environ.get('ALLOWED_API_KEYS', '').split(',')
+# Parsed once per container; the environment cannot change between invocations
+VALID_API_KEYS = frozenset(k.strip() for k in ALLOWED_API_KEYS if k.strip())
 URL_EXPIRY_SECONDS = int(os.environ.get('URL_EXPIRY_SECONDS', '3600'))
 
-# S3 client
-s3_client = boto3.client('s3')
+# S3 client, created on first use so preflight and rejected requests on a
+# cold container never pay for loading the S3 service model
+_s3_client = None
+
+
+def get_s3_client():
+    """Get the S3 client, creating it on first use."""
+    global _s3_client
+    if _s3_client is None:
+        _s3_client = boto3.client('s3')
+    return _s3_client
+
+# Pre-signed URLs keyed by database -> (reuse deadline, url). A URL is handed
+# out until half its expiry has elapsed, so callers always get at least
+# URL_EXPIRY_SECONDS / 2 of validity while warm containers skip re-signing
+_URL_CACHE: Dict[str, Tuple[float, str]] = {}
 
 # Available databases mapping
 AVAILABLE_DATABASES = {
@@ -29,41 +46,56 @@ AVAILABLE_DATABASES = {
     'IP2PROXY-IP-PROXYTYPE-COUNTRY.BIN': 'raw/ip2location/IP2PROXY-IP-PROXYTYPE-COUNTRY.BIN',
 }
 
+# Database list for the common databases="all" request
+ALL_DATABASES = tuple(AVAILABLE_DATABASES)
+
+
+# Headers shared by every response (read-only; never mutated per request)
+RESPONSE_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type,X-API-Key',
+    'Access-Control-Allow-Methods': 'POST,OPTIONS',
+}
+
 
 def generate_response(status_code: int, body: Any) -> Dict:
     """Generate API Gateway response."""
     return {
         'statusCode': status_code,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Headers': 'Content-Type,X-API-Key',
-            'Access-Control-Allow-Methods': 'POST,OPTIONS',
-        },
+        'headers': RESPONSE_HEADERS,
         'body': json.dumps(body) if not isinstance(body, str) else body
     }
 
 
+# CORS preflight response, identical for every OPTIONS request
+OPTIONS_RESPONSE = generate_response(200, '')
+
+
 def validate_api_key(api_key: str) -> bool:
     """Validate API key against allowed list."""
-    if not api_key or not ALLOWED_API_KEYS:
+    if not api_key:
         return False
     
-    # Clean up the allowed keys list (remove empty strings)
-    valid_keys = [k.strip() for k in ALLOWED_API_KEYS if k.strip()]
-    
-    return api_key in valid_keys
+    return api_key in VALID_API_KEYS
 
 
-def generate_presigned_urls(databases: List[str]) -> Dict[str, str]:
+def generate_presigned_urls(databases: Sequence[str]) -> Dict[str, str]:
     """Generate pre-signed URLs for requested databases."""
     urls = {}
     
+    now = time.monotonic()
+    
     for db_name in databases:
+        cached = _URL_CACHE.get(db_name)
+        if cached is not None and now < cached[0]:
+            urls[db_name] = cached[1]
+            continue
+        
         s3_key = AVAILABLE_DATABASES.get(db_name)
         if s3_key:
             try:
-                url = s3_client.generate_presigned_url(
+                url = get_s3_client().generate_presigned_url(
                     'get_object',
                     Params={
                         'Bucket': S3_BUCKET,
@@ -72,6 +104,7 @@ def generate_presigned_urls(databases: List[str]) -> Dict[str, str]:
                     ExpiresIn=URL_EXPIRY_SECONDS
                 )
                 urls[db_name] = url
+                _URL_CACHE[db_name] = (now + URL_EXPIRY_SECONDS / 2, url)
             except Exception as e:
                 print(f"Error generating URL for {db_name}: {str(e)}")
     
@@ -83,7 +116,7 @@ def lambda_handler(event: Dict, context: Any) -> Dict:
     try:
         # Handle OPTIONS request for CORS
         if event.get('httpMethod') == 'OPTIONS':
-            return generate_response(200, '')
+            return OPTIONS_RESPONSE
         
         # Validate HTTP method
         if event.get('httpMethod') != 'POST':
@@ -109,10 +142,10 @@ def lambda_handler(event: Dict, context: Any) -> Dict:
         requested_databases = body.get('databases', 'all')
         
         if requested_databases == 'all':
-            databases = list(AVAILABLE_DATABASES.keys())
+            databases = ALL_DATABASES
         elif isinstance(requested_databases, list):
-            # Validate requested databases exist
-            databases = [db for db in requested_databases if db in AVAILABLE_DATABASES]
+            # Validate requested databases exist, dropping repeats
+            databases = [db for db in dict.fromkeys(requested_databases) if db in AVAILABLE_DATABASES]
             if not databases and requested_databases:
                 return generate_response(400, {'error': 'No valid databases in request'})
         else: